@@ -6,12 +6,25 @@ import time
 import threading
 import json
 import os
+import uuid
+import getpass
 import pygame
 from datetime import datetime
 import tkinter as tk
 from tkinter import simpledialog, messagebox
 import platform
 import rumps  # Mac OS specific library for menu bar apps
+from tasks import TaskList, parse_task_input
+from archive import TaskArchive
+from outbox import Outbox
+from sync import SyncReplica, load_device_id
+from hooks import HookRunner
+from dialogs import QuickEntryWindow, SettingsWindow
+from planner import Planner
+from sessions import SessionLog
+from export import SessionExporter
+
+SYNC_INTERVAL = 30  # Seconds between checks for task changes from other devices
 
 class PomodoroTrayApp:
     def __init__(self):
@@ -23,14 +36,27 @@ class PomodoroTrayApp:
         self.short_break_time = 5 * 60  # 5 minutes in seconds
         self.long_break_time = 15 * 60  # 15 minutes in seconds
         self.long_break_interval = 4  # After 4 pomodoros
+        self.archive_after_days = 7  # Archive tasks completed more than a week ago
+        self.user_name = getpass.getuser()  # Name reported with completed sessions
+        self.team = ""
+        self.outbox_url = None  # e.g. http://localhost:8765/events to share sessions
+        self.sync_enabled = False  # Merge task changes with other devices sharing data/
+        self.hook_configs = []  # Actions to run when a timer completes
+        self.day_end = "18:00"  # Pomodoros are planned up to this time of day
         
         # State variables
         self.timer_running = False
         self.current_time = self.pomodoro_time
         self.timer_mode = "pomodoro"  # pomodoro, short_break, long_break
+        self.deadline = None  # Wall-clock time the running timer reaches zero
+        self.active_task = None  # Index of the task focus time is credited to
+        self.focus_started = None  # When the current stretch of focus began
+        self.session_started = None  # When the current session was first started
         self.pomodoro_count = 0
         self.timer_thread = None
-        self.tasks = []
+        self.tasks = TaskList()
+        self.archive = TaskArchive()
+        self.sessions = SessionLog()
         
         # Create directories if they don't exist
         os.makedirs("data", exist_ok=True)
@@ -39,17 +65,46 @@ class PomodoroTrayApp:
         
         # Load settings and tasks
         self.load_settings()
+        self.sync = SyncReplica(self.device_id()) if self.sync_enabled else None
         self.load_tasks()
+        resume_timer = self.restore_timer()
+        self.replan()
+        
+        # Ship completed sessions to the remote tracker in the background
+        self.outbox = None
+        if self.outbox_url:
+            self.outbox = Outbox(self.outbox_url)
+            self.outbox.start()
+        
+        # Completion hooks run on worker threads so they can't hold up the timer
+        self.hooks = HookRunner(self.hook_configs)
         
         # Create a root tkinter window (hidden) for dialogs
         self.root = tk.Tk()
         self.root.withdraw()  # Hide the root window
         
+        # Pick up task changes from other devices
+        if self.sync:
+            self.root.after(SYNC_INTERVAL * 1000, self.pull_sync)
+        
+        # Build the dialogs once up front so they open instantly later
+        self.task_window = QuickEntryWindow(self.root, self.save_new_task)
+        self.settings_window = SettingsWindow(self.root, [
+            ("pomodoro", "Pomodoro (minutes):"),
+            ("short_break", "Short Break (minutes):"),
+            ("long_break", "Long Break (minutes):"),
+            ("interval", "Long Break Interval:")
+        ], self.apply_settings)
+        
         # Load the icon from file
         self.icon = self.load_icon()
         
         # Setup and start the tray app
         self.setup_tray()
+        
+        # Carry on with a session that was running when the app last exited
+        if resume_timer:
+            self.start_timer()
     
     def load_icon(self):
         """Load the icon image from file based on current mode"""
@@ -176,13 +231,21 @@ class PomodoroTrayApp:
     
     def create_tasks_menu(self):
         """Create a submenu for tasks"""
-        tasks_menu_items = [pystray.MenuItem('Add Task...', self.add_task)]
+        tasks_menu_items = [
+            pystray.MenuItem('Add Task...', self.add_task),
+            pystray.MenuItem('Search History...', self.search_history),
+            pystray.MenuItem("Today's Plan", self.create_plan_menu()),
+            pystray.MenuItem('Time Report', self.show_time_report),
+            pystray.MenuItem('Export Sessions', self.export_sessions)
+        ]
         
         if self.tasks:
             tasks_menu_items.append(pystray.Menu.SEPARATOR)
             
             for i, task in enumerate(self.tasks):
                 prefix = "✓ " if task["completed"] else "○ "
+                if i == self.active_task:
+                    prefix = "▶ "
                 # Create a function that returns another function to properly capture i
                 def make_handler(idx):
                     def toggle_handler(icon):
@@ -194,14 +257,30 @@ class PomodoroTrayApp:
                         self.delete_task(idx)
                     return delete_handler
                 
+                def make_active_handler(idx):
+                    def active_handler(icon):
+                        self.set_active_task(idx)
+                    return active_handler
+                
                 task_menu = pystray.MenuItem(f"{prefix}{task['name']}", pystray.Menu(
                     pystray.MenuItem('Complete/Uncomplete', make_handler(i)),
+                    pystray.MenuItem('Work On This' if i != self.active_task else 'Stop Working On This', make_active_handler(i)),
                     pystray.MenuItem('Delete', make_delete_handler(i))
                 ))
                 tasks_menu_items.append(task_menu)
         
         return pystray.Menu(*tasks_menu_items)
     
+    def create_plan_menu(self):
+        """Create a submenu listing today's planned pomodoros"""
+        plan_items = [
+            pystray.MenuItem(f"{datetime.fromtimestamp(start):%H:%M}  {name}", None, enabled=False)
+            for start, end, key, name in self.planner.schedule()
+        ]
+        if not plan_items:
+            plan_items = [pystray.MenuItem("Nothing planned", None, enabled=False)]
+        return pystray.Menu(*plan_items)
+    
     def update_menu(self):
         """Update the menu to reflect current state"""
         # Use tkinter's after method to ensure this runs on the main thread
@@ -252,6 +331,14 @@ class PomodoroTrayApp:
         """Start the timer"""
         if not self.timer_running:
             self.timer_running = True
+            self.deadline = time.time() + self.current_time
+            # Resuming after a pause keeps the session's original start
+            if self.session_started is None:
+                self.session_started = time.time()
+            # A resumed session keeps the focus start restored from the checkpoint
+            if self.timer_mode == "pomodoro" and self.focus_started is None:
+                self.focus_started = time.time()
+            self.save_timer_state()
             
             # Start timer in a separate thread
             self.timer_thread = threading.Thread(target=self.run_timer)
@@ -260,11 +347,17 @@ class PomodoroTrayApp:
     
     def pause_timer(self, _=None):
         """Pause the timer"""
-        self.timer_running = False
+        if self.timer_running:
+            self.timer_running = False
+            self.current_time = self.remaining_time()
+            self.save_timer_state()
+            self.credit_active_task()
     
     def reset_timer(self, _=None):
         """Reset the timer"""
         self.timer_running = False
+        self.credit_active_task()
+        self.session_started = None
         
         # Set time based on mode
         if self.timer_mode == "pomodoro":
@@ -273,6 +366,7 @@ class PomodoroTrayApp:
             self.current_time = self.short_break_time
         elif self.timer_mode == "long_break":
             self.current_time = self.long_break_time
+        self.save_timer_state()
         
         # Update the icon and menu
         self.update_menu()
@@ -281,7 +375,11 @@ class PomodoroTrayApp:
         """Run the timer countdown"""
         while self.current_time > 0 and self.timer_running:
             time.sleep(1)
-            self.current_time -= 1
+            if not self.timer_running:
+                # Paused or reset while sleeping; keep the value they set
+                break
+            # Count down from the deadline so the display doesn't drift
+            self.current_time = self.remaining_time()
             
             # Update the timer display in the system tray
             if hasattr(self, 'tray'):
@@ -302,6 +400,20 @@ class PomodoroTrayApp:
             
         self.timer_running = False
         
+        # Record the finished session and queue it for the remote tracker and hooks
+        event = self.session_event()
+        try:
+            self.sessions.record(event)
+        except Exception as e:
+            print(f"Error recording session: {e}")
+        if self.outbox:
+            self.outbox.put(event)
+        self.hooks.fire(event)
+        
+        # Credit the finished pomodoro to the active task
+        if self.timer_mode == "pomodoro":
+            self.credit_active_task(finished=True)
+        
         # Play sound
         try:
             if os.path.exists("sounds/bell.mp3"):
@@ -340,6 +452,10 @@ class PomodoroTrayApp:
         
         # Save stats
         self.save_settings()
+        
+        # The rest of the day has moved on, so plan it again
+        self.replan()
+        self.update_menu()
     
     def generate_beep(self):
         """Generate a simple beep sound as fallback"""
@@ -350,6 +466,33 @@ class PomodoroTrayApp:
             127, 127, 127, 127, 127, 127, 127, 127
         ] * 100)
     
+    def session_event(self):
+        """Describe the session that just finished"""
+        if self.timer_mode == "pomodoro":
+            duration = self.pomodoro_time
+        elif self.timer_mode == "short_break":
+            duration = self.short_break_time
+        else:
+            duration = self.long_break_time
+        
+        task = None
+        if self.timer_mode == "pomodoro" and self.active_task is not None:
+            task = self.tasks[self.active_task]["name"]
+        
+        completed_at = int(time.time())
+        # Pauses make a session longer than its duration, so use when it really started
+        started_at = int(self.session_started) if self.session_started else completed_at - duration
+        return {
+            "id": uuid.uuid4().hex,  # Lets the server ignore resent events
+            "user": self.user_name,
+            "team": self.team,
+            "mode": self.timer_mode,
+            "task": task,
+            "duration": duration,
+            "started_at": started_at,
+            "completed_at": completed_at
+        }
+    
     def format_time(self):
         """Format the current time as MM:SS"""
         mins, secs = divmod(self.current_time, 60)
@@ -377,83 +520,294 @@ class PomodoroTrayApp:
         self.reset_timer()
     
     def add_task(self, _=None):
-        """Add a new task"""
-        task_name = simpledialog.askstring("Add Task", "Enter a new task:", parent=self.root)
-        
-        if task_name and task_name.strip():
-            self.tasks.append({
-                "name": task_name.strip(),
-                "completed": False,
-                "created_at": datetime.now().isoformat()
-            })
-            self.save_tasks()
+        """Show the quick-entry window for a new task"""
+        # Tk must only be touched from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            self.root.after(0, self.add_task)
+            return
+        
+        self.task_window.show()
+    
+    def save_new_task(self, task_name):
+        """Add the task entered in the quick-entry window"""
+        if task_name and self.create_task(task_name):
             self.update_menu()
     
+    def create_task(self, text):
+        """Add a task from text like "Write report ~3 !2"; returns False if empty"""
+        name, estimate, priority = parse_task_input(text)
+        if not name:
+            return False
+        
+        if self.sync:
+            try:
+                record = self.sync.add(name, estimate=estimate, priority=priority)
+            except Exception as e:
+                print(f"Error syncing task: {e}")
+                return False
+            self.tasks.append(record)
+        else:
+            self.tasks.add(name, estimate=estimate, priority=priority)
+        
+        self.planner.add(len(self.tasks) - 1, name, estimate, priority, int(time.time()))
+        self.save_tasks()
+        return True
+    
     def toggle_task_completed(self, task_index):
         """Toggle task completed status"""
         if 0 <= task_index < len(self.tasks):
-            self.tasks[task_index]["completed"] = not self.tasks[task_index]["completed"]
+            completed = not self.tasks.is_completed(task_index)
+            if self.sync:
+                try:
+                    self.sync.set_completed(self.tasks[task_index]["id"], completed)
+                except Exception as e:
+                    print(f"Error syncing task: {e}")
+                    return
+            self.tasks.set_completed(task_index, completed)
+            
+            # Hand the task's remaining slots in today's plan to the next tasks
+            if completed:
+                self.planner.complete(task_index, time.time())
+            else:
+                # Keep the task's original creation time so it keeps its place among equal priorities
+                task = self.tasks.record(task_index)
+                self.planner.add(task_index, task["name"], task.get("estimate", 1),
+                                 task.get("priority", 0), task["created_at"])
             self.save_tasks()
             self.update_menu()
     
     def delete_task(self, task_index):
         """Delete a task"""
         if 0 <= task_index < len(self.tasks):
+            if self.sync:
+                try:
+                    self.sync.delete(self.tasks[task_index]["id"])
+                except Exception as e:
+                    print(f"Error syncing task: {e}")
+                    return
             del self.tasks[task_index]
+            self.replan()
+            
+            # Keep the active task pointing at the same task
+            if self.active_task == task_index:
+                self.active_task = None
+            elif self.active_task is not None and self.active_task > task_index:
+                self.active_task -= 1
             self.save_tasks()
             self.update_menu()
     
-    def open_settings(self, _=None):
-        """Open settings dialog"""
-        # Create a new dialog window
-        settings_window = tk.Toplevel(self.root)
-        settings_window.title("Settings")
-        settings_window.geometry("300x200")
-        settings_window.resizable(False, False)
-        
-        # Add settings fields
-        tk.Label(settings_window, text="Pomodoro (minutes):").grid(row=0, column=0, sticky="w", padx=10, pady=5)
-        pomodoro_entry = tk.Entry(settings_window, width=10)
-        pomodoro_entry.grid(row=0, column=1, padx=10, pady=5)
-        pomodoro_entry.insert(0, str(self.pomodoro_time // 60))
-        
-        tk.Label(settings_window, text="Short Break (minutes):").grid(row=1, column=0, sticky="w", padx=10, pady=5)
-        short_break_entry = tk.Entry(settings_window, width=10)
-        short_break_entry.grid(row=1, column=1, padx=10, pady=5)
-        short_break_entry.insert(0, str(self.short_break_time // 60))
-        
-        tk.Label(settings_window, text="Long Break (minutes):").grid(row=2, column=0, sticky="w", padx=10, pady=5)
-        long_break_entry = tk.Entry(settings_window, width=10)
-        long_break_entry.grid(row=2, column=1, padx=10, pady=5)
-        long_break_entry.insert(0, str(self.long_break_time // 60))
-        
-        tk.Label(settings_window, text="Long Break Interval:").grid(row=3, column=0, sticky="w", padx=10, pady=5)
-        interval_entry = tk.Entry(settings_window, width=10)
-        interval_entry.grid(row=3, column=1, padx=10, pady=5)
-        interval_entry.insert(0, str(self.long_break_interval))
-        
-        # Save button
-        def save_settings():
+    def set_active_task(self, task_index):
+        """Credit focus time to this task from now on (or stop, if it already is)"""
+        # Time so far belongs to the previously active task
+        if self.timer_running and self.timer_mode == "pomodoro":
+            self.credit_active_task()
+            self.focus_started = time.time()
+        
+        if self.active_task == task_index or not 0 <= task_index < len(self.tasks):
+            self.active_task = None
+        else:
+            self.active_task = task_index
+        self.save_timer_state()
+        self.update_menu()
+    
+    def credit_active_task(self, finished=False):
+        """Add the focus time since the last credit to the active task"""
+        started, self.focus_started = self.focus_started, None
+        if started is None or self.active_task is None:
+            return
+        
+        seconds = max(0, int(time.time() - started))
+        pomodoros = 1 if finished else 0
+        self.tasks.credit_focus(self.active_task, seconds, pomodoros)
+        if self.sync:
             try:
-                # Parse and save settings
-                self.pomodoro_time = int(pomodoro_entry.get()) * 60
-                self.short_break_time = int(short_break_entry.get()) * 60
-                self.long_break_time = int(long_break_entry.get()) * 60
-                self.long_break_interval = int(interval_entry.get())
-                
-                self.save_settings()
-                self.reset_timer()
-                settings_window.destroy()
-            except ValueError:
-                messagebox.showerror("Error", "Please enter valid numbers for all settings.")
+                self.sync.increment(self.tasks[self.active_task]["id"], focus_seconds=seconds, pomodoros=pomodoros)
+            except Exception as e:
+                print(f"Error syncing focus time: {e}")
+        self.save_tasks()
+    
+    def time_report(self):
+        """Lines describing the tasks with the most focus time"""
+        lines = []
+        for index in self.tasks.top_by_focus(10):
+            task = self.tasks[index]
+            hours, minutes = divmod(task["focus_seconds"] // 60, 60)
+            lines.append(f"{task['name']}: {hours}h {minutes:02d}m, {task['pomodoros']} pomodoros")
+        return "\n".join(lines) or "No focus time tracked yet."
+    
+    def show_time_report(self, _=None):
+        """Show the tasks with the most focus time"""
+        # Tk must only be touched from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            self.root.after(0, self.show_time_report)
+            return
         
-        save_button = tk.Button(settings_window, text="Save", command=save_settings)
-        save_button.grid(row=4, column=0, columnspan=2, pady=20)
+        messagebox.showinfo("Time Report", self.time_report())
+    
+    def write_exports(self):
+        """Write every recorded session to data/exports as ICS and CSV"""
+        exporter = SessionExporter(self.sessions)
+        paths = []
+        for fmt in ("ics", "csv"):
+            path = os.path.join("data", "exports", f"sessions.{fmt}")
+            exporter.export_file(fmt, path)
+            paths.append(os.path.abspath(path))
+        return paths
+    
+    def export_sessions(self, _=None):
+        """Export focus sessions for calendars and spreadsheets"""
+        try:
+            paths = self.write_exports()
+        except Exception as e:
+            print(f"Error exporting sessions: {e}")
+            self.tray.notify("Export Failed", str(e))
+            return
+        self.tray.notify("Sessions Exported", "\n".join(paths))
+    
+    def search_history(self, _=None):
+        """Search archived tasks by name"""
+        # Tk must only be touched from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            self.root.after(0, self.search_history)
+            return
+        
+        query = simpledialog.askstring("Search History", "Find archived tasks containing\n(leave empty for most recent):", parent=self.root)
+        if query is None:
+            return
+        
+        matches = self.archive.search(query.strip()) if query.strip() else self.archive.recent()
+        if matches:
+            messagebox.showinfo("Task History", "\n".join(f"✓ {task['name']}" for task in matches))
+        else:
+            messagebox.showinfo("Task History", "No archived tasks found.")
+    
+    def open_settings(self, _=None):
+        """Show the settings window with the current values"""
+        # Tk must only be touched from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            self.root.after(0, self.open_settings)
+            return
+        
+        self.settings_window.show({
+            "pomodoro": self.pomodoro_time // 60,
+            "short_break": self.short_break_time // 60,
+            "long_break": self.long_break_time // 60,
+            "interval": self.long_break_interval
+        })
+    
+    def apply_settings(self, values):
+        """Save the values entered in the settings window"""
+        try:
+            # Parse everything first so a typo doesn't apply half the settings
+            pomodoro_time = int(values["pomodoro"]) * 60
+            short_break_time = int(values["short_break"]) * 60
+            long_break_time = int(values["long_break"]) * 60
+            long_break_interval = int(values["interval"])
+        except ValueError:
+            messagebox.showerror("Error", "Please enter valid numbers for all settings.", parent=self.settings_window.window)
+            return False
+        
+        self.pomodoro_time = pomodoro_time
+        self.short_break_time = short_break_time
+        self.long_break_time = long_break_time
+        self.long_break_interval = long_break_interval
+        
+        self.save_settings()
+        self.reset_timer()
+        self.replan()
+        return True
+    
+    def replan(self):
+        """Plan open tasks into the pomodoros left before day_end"""
+        self.planner = Planner(self.pomodoro_time, self.short_break_time,
+                               self.long_break_time, self.long_break_interval)
+        try:
+            # Accept "18:00" as well as a bare hour like 18 from a hand-edited file
+            hours, _, minutes = str(self.day_end).partition(":")
+            end = datetime.now().replace(hour=int(hours), minute=int(minutes or 0),
+                                         second=0, microsecond=0).timestamp()
+        except ValueError:
+            end = time.time()
+        
+        self.planner.plan(self.tasks.open_tasks(), time.time(), end, self.pomodoro_count)
+    
+    def remaining_time(self):
+        """Whole seconds left until the running timer's deadline"""
+        return max(0, round(self.deadline - time.time()))
+    
+    def save_timer_state(self):
+        """Checkpoint the timer so a session survives a crash or logout
         
-        # Make sure dialog is modal
-        settings_window.transient(self.root)
-        settings_window.grab_set()
-        self.root.wait_window(settings_window)
+        Only called when the timer starts, pauses or switches mode, never
+        on every tick.
+        """
+        state = {"mode": self.timer_mode, "running": self.timer_running}
+        if self.timer_running:
+            state["deadline"] = self.deadline
+        else:
+            state["remaining"] = self.current_time
+        if self.focus_started is not None:
+            state["focus_started"] = self.focus_started
+        if self.session_started is not None:
+            state["session_started"] = self.session_started
+        if self.active_task is not None:
+            task = self.tasks.record(self.active_task)
+            state["active_task"] = {"index": self.active_task, "id": task.get("id"),
+                                    "name": task["name"], "created_at": task["created_at"]}
+        
+        try:
+            # Write then rename so a crash can't leave a half-written file
+            with open("data/timer.json.tmp", "w") as f:
+                json.dump(state, f)
+            os.replace("data/timer.json.tmp", "data/timer.json")
+        except:
+            # Silently fail if can't save the timer
+            pass
+    
+    def restore_timer(self):
+        """Restore the timer checkpoint; returns True if it was running"""
+        try:
+            if not os.path.exists("data/timer.json"):
+                return False
+            with open("data/timer.json", "r") as f:
+                state = json.load(f)
+            
+            self.timer_mode = state.get("mode", self.timer_mode)
+            self.active_task = self.find_task(state.get("active_task"))
+            self.session_started = state.get("session_started")
+            if state.get("running"):
+                # Time kept passing while the app wasn't running
+                self.deadline = state["deadline"]
+                self.current_time = self.remaining_time()
+                if state.get("focus_started") is not None:
+                    # Don't count time past a deadline that went by while the app was closed
+                    self.focus_started = state["focus_started"] + max(0, time.time() - self.deadline)
+                return True
+            self.current_time = state.get("remaining", self.current_time)
+        except:
+            # Silently fail if can't load the timer
+            pass
+        return False
+    
+    def find_task(self, ref):
+        """Index of the task a timer checkpoint refers to, or None if it's gone"""
+        if not ref:
+            return None
+        if ref.get("id"):
+            return self.tasks.index_of(ref["id"])
+        
+        # Archiving at startup can shift indices, so make sure it's the same task
+        def matches(index):
+            task = self.tasks.record(index)
+            return task["name"] == ref.get("name") and task["created_at"] == ref.get("created_at")
+        
+        index = ref.get("index")
+        if isinstance(index, int) and 0 <= index < len(self.tasks) and matches(index):
+            return index
+        for index in range(len(self.tasks)):
+            if matches(index):
+                return index
+        return None
     
     def save_settings(self):
         """Save settings to a file"""
@@ -462,7 +816,14 @@ class PomodoroTrayApp:
             "short_break_time": self.short_break_time,
             "long_break_time": self.long_break_time,
             "long_break_interval": self.long_break_interval,
-            "pomodoro_count": self.pomodoro_count
+            "pomodoro_count": self.pomodoro_count,
+            "archive_after_days": self.archive_after_days,
+            "user_name": self.user_name,
+            "team": self.team,
+            "outbox_url": self.outbox_url,
+            "sync_enabled": self.sync_enabled,
+            "hooks": self.hook_configs,
+            "day_end": self.day_end
         }
         
         try:
@@ -484,31 +845,116 @@ class PomodoroTrayApp:
                 self.long_break_time = settings.get("long_break_time", self.long_break_time)
                 self.long_break_interval = settings.get("long_break_interval", self.long_break_interval)
                 self.pomodoro_count = settings.get("pomodoro_count", self.pomodoro_count)
+                self.archive_after_days = settings.get("archive_after_days", self.archive_after_days)
+                self.user_name = settings.get("user_name", self.user_name)
+                self.team = settings.get("team", self.team)
+                self.outbox_url = settings.get("outbox_url", self.outbox_url)
+                self.sync_enabled = settings.get("sync_enabled", self.sync_enabled)
+                self.hook_configs = settings.get("hooks", self.hook_configs)
+                self.day_end = settings.get("day_end", self.day_end)
         except:
             # Silently fail if can't load settings
             pass
     
     def save_tasks(self):
         """Save tasks to a file"""
+        if self.sync:
+            # Changes are already in this device's sync log; rewriting the
+            # shared tasks.json would clobber other devices' edits
+            return
+        
         try:
             with open("data/tasks.json", "w") as f:
-                json.dump(self.tasks, f)
+                json.dump(self.tasks.to_records(), f)
         except:
             # Silently fail if can't save tasks
             pass
     
     def load_tasks(self):
         """Load tasks from file"""
+        if self.sync:
+            self.load_synced_tasks()
+            return
+        
         try:
             if os.path.exists("data/tasks.json"):
                 with open("data/tasks.json", "r") as f:
-                    self.tasks = json.load(f)
+                    self.tasks = TaskList.from_records(json.load(f))
         except:
             # Silently fail if can't load tasks
             pass
+        
+        self.archive_tasks()
+    
+    def archive_tasks(self):
+        """Move tasks completed more than archive_after_days ago to the archive"""
+        cutoff = time.time() - self.archive_after_days * 24 * 60 * 60
+        archived = self.tasks.completed_before(cutoff)
+        if archived:
+            try:
+                # Write the archive first so a crash can't lose tasks
+                self.archive.append(archived)
+            except Exception as e:
+                # Keep the tasks active and try again next start
+                print(f"Error archiving tasks: {e}")
+                return
+            self.tasks.pop_completed_before(cutoff)
+            self.save_tasks()
+    
+    def device_id(self):
+        """Name of this device's sync log, generated once per user and machine"""
+        return load_device_id("~/.pomodoro_device_id")
+    
+    def load_synced_tasks(self):
+        """Build the task list from the merged sync logs"""
+        try:
+            self.sync.load()
+            
+            # The first device to enable sync seeds the logs with its tasks.json
+            if not self.sync.clock and os.path.exists("data/tasks.json"):
+                with open("data/tasks.json", "r") as f:
+                    existing = TaskList.from_records(json.load(f))
+                for record in existing.to_records():
+                    self.sync.import_record(record)
+            
+            self.tasks = TaskList.from_records(self.sync.records())
+        except Exception as e:
+            print(f"Error loading synced tasks: {e}")
+    
+    def pull_sync(self, _=None):
+        """Merge task changes made on other devices"""
+        try:
+            if self.sync.pull():
+                active_id = self.tasks[self.active_task]["id"] if self.active_task is not None else None
+                self.tasks = TaskList.from_records(self.sync.records())
+                self.active_task = self.tasks.index_of(active_id) if active_id else None
+                self.replan()
+                self.update_menu()
+        except Exception as e:
+            print(f"Sync error: {e}")
+        
+        self.root.after(SYNC_INTERVAL * 1000, self.pull_sync)
     
     def quit_app(self, _=None):
         """Quit the application"""
+        # Credit the focus time so far; the checkpoint carries the session on
+        if self.timer_running and self.timer_mode == "pomodoro":
+            self.credit_active_task()
+            self.focus_started = time.time()
+        self.save_timer_state()
+        if self.sync:
+            try:
+                self.sync.snapshot()
+            except OSError as e:
+                print(f"Error saving sync snapshot: {e}")
+        if self.outbox:
+            self.outbox.stop()
+        self.hooks.shutdown()
+        if self.hooks.hooks:
+            try:
+                self.hooks.save_stats("data/hook_stats.json")
+            except OSError as e:
+                print(f"Error saving hook stats: {e}")
         if self.tray.visible:
             self.tray.stop()
         self.root.destroy()
@@ -534,14 +980,27 @@ class PomodoroMacApp(rumps.App):
         self.short_break_time = 5 * 60  # 5 minutes in seconds
         self.long_break_time = 15 * 60  # 15 minutes in seconds
         self.long_break_interval = 4  # After 4 pomodoros
+        self.archive_after_days = 7  # Archive tasks completed more than a week ago
+        self.user_name = getpass.getuser()  # Name reported with completed sessions
+        self.team = ""
+        self.outbox_url = None  # e.g. http://localhost:8765/events to share sessions
+        self.sync_enabled = False  # Merge task changes with other devices sharing data/
+        self.hook_configs = []  # Actions to run when a timer completes
+        self.day_end = "18:00"  # Pomodoros are planned up to this time of day
         
         # State variables
         self.timer_running = False
         self.current_time = self.pomodoro_time
         self.timer_mode = "pomodoro"  # pomodoro, short_break, long_break
+        self.deadline = None  # Wall-clock time the running timer reaches zero
+        self.active_task = None  # Index of the task focus time is credited to
+        self.focus_started = None  # When the current stretch of focus began
+        self.session_started = None  # When the current session was first started
         self.pomodoro_count = 0
         self.timer_thread = None
-        self.tasks = []
+        self.tasks = TaskList()
+        self.archive = TaskArchive()
+        self.sessions = SessionLog()
         
         # Create directories if they don't exist
         os.makedirs("data", exist_ok=True)
@@ -550,13 +1009,35 @@ class PomodoroMacApp(rumps.App):
         
         # Load settings and tasks
         self.load_settings()
+        self.sync = SyncReplica(self.device_id()) if self.sync_enabled else None
         self.load_tasks()
+        resume_timer = self.restore_timer()
+        self.replan()
+        
+        # Ship completed sessions to the remote tracker in the background
+        self.outbox = None
+        if self.outbox_url:
+            self.outbox = Outbox(self.outbox_url)
+            self.outbox.start()
+        
+        # Completion hooks run on worker threads so they can't hold up the timer
+        self.hooks = HookRunner(self.hook_configs)
 
         # Title will show as "Pomodoro | 25:00"
         super(PomodoroMacApp, self).__init__("Pomodoro", icon="images/pomodoro.png", quit_button=None)
         
         # Setup the menu
         self.setup_menu()
+        
+        # Pick up task changes from other devices
+        if self.sync:
+            self.sync_timer = rumps.Timer(self.pull_sync, SYNC_INTERVAL)
+            self.sync_timer.start()
+        
+        # Carry on with a session that was running when the app last exited
+        self.update_title()
+        if resume_timer:
+            self.start_timer()
     
     def setup_menu(self):
         # Timer control
@@ -585,14 +1066,28 @@ class PomodoroMacApp(rumps.App):
         while len(self.tasks_menu) > 0:
             self.tasks_menu.pop(0)
             
-        # Add task option
+        # Add task and history options
         self.tasks_menu.add(rumps.MenuItem("Add Task...", callback=self.add_task))
+        self.tasks_menu.add(rumps.MenuItem("Search History...", callback=self.search_history))
+        
+        # Today's plan
+        plan_menu = rumps.MenuItem("Today's Plan")
+        schedule = self.planner.schedule()
+        for start, end, key, name in schedule:
+            plan_menu.add(rumps.MenuItem(f"{datetime.fromtimestamp(start):%H:%M}  {name}"))
+        if not schedule:
+            plan_menu.add(rumps.MenuItem("Nothing planned"))
+        self.tasks_menu.add(plan_menu)
+        self.tasks_menu.add(rumps.MenuItem("Time Report", callback=self.show_time_report))
+        self.tasks_menu.add(rumps.MenuItem("Export Sessions", callback=self.export_sessions))
         
         if self.tasks:
             self.tasks_menu.add(None)  # Separator
             
             for i, task in enumerate(self.tasks):
                 prefix = "✓ " if task["completed"] else "○ "
+                if i == self.active_task:
+                    prefix = "▶ "
                 task_menu = rumps.MenuItem(f"{prefix}{task['name']}")
                 
                 # Add complete/uncomplete option
@@ -603,6 +1098,15 @@ class PomodoroMacApp(rumps.App):
                 
                 task_menu.add(rumps.MenuItem("Complete/Uncomplete", callback=make_toggle_callback(i)))
                 
+                # Add option to credit focus time to this task
+                def make_active_callback(idx):
+                    def callback(_):
+                        self.set_active_task(idx)
+                    return callback
+                
+                active_label = "Stop Working On This" if i == self.active_task else "Work On This"
+                task_menu.add(rumps.MenuItem(active_label, callback=make_active_callback(i)))
+                
                 # Add delete option
                 def make_delete_callback(idx):
                     def callback(_):
@@ -615,6 +1119,14 @@ class PomodoroMacApp(rumps.App):
     def start_timer(self, _=None):
         if not self.timer_running:
             self.timer_running = True
+            self.deadline = time.time() + self.current_time
+            # Resuming after a pause keeps the session's original start
+            if self.session_started is None:
+                self.session_started = time.time()
+            # A resumed session keeps the focus start restored from the checkpoint
+            if self.timer_mode == "pomodoro" and self.focus_started is None:
+                self.focus_started = time.time()
+            self.save_timer_state()
             
             # Start timer in a separate thread
             self.timer_thread = threading.Thread(target=self.run_timer)
@@ -622,10 +1134,16 @@ class PomodoroMacApp(rumps.App):
             self.timer_thread.start()
     
     def pause_timer(self, _=None):
-        self.timer_running = False
+        if self.timer_running:
+            self.timer_running = False
+            self.current_time = self.remaining_time()
+            self.save_timer_state()
+            self.credit_active_task()
     
     def reset_timer(self, _=None):
         self.timer_running = False
+        self.credit_active_task()
+        self.session_started = None
         
         # Set time based on mode
         if self.timer_mode == "pomodoro":
@@ -634,6 +1152,7 @@ class PomodoroMacApp(rumps.App):
             self.current_time = self.short_break_time
         elif self.timer_mode == "long_break":
             self.current_time = self.long_break_time
+        self.save_timer_state()
         
         # Update the title
         self.update_title()
@@ -641,7 +1160,11 @@ class PomodoroMacApp(rumps.App):
     def run_timer(self):
         while self.current_time > 0 and self.timer_running:
             time.sleep(1)
-            self.current_time -= 1
+            if not self.timer_running:
+                # Paused or reset while sleeping; keep the value they set
+                break
+            # Count down from the deadline so the display doesn't drift
+            self.current_time = self.remaining_time()
             
             # Update the title
             self.update_title()
@@ -658,6 +1181,20 @@ class PomodoroMacApp(rumps.App):
     def timer_completed(self):
         self.timer_running = False
         
+        # Record the finished session and queue it for the remote tracker and hooks
+        event = self.session_event()
+        try:
+            self.sessions.record(event)
+        except Exception as e:
+            print(f"Error recording session: {e}")
+        if self.outbox:
+            self.outbox.put(event)
+        self.hooks.fire(event)
+        
+        # Credit the finished pomodoro to the active task
+        if self.timer_mode == "pomodoro":
+            self.credit_active_task(finished=True)
+        
         # Play sound
         try:
             if os.path.exists("sounds/bell.mp3"):
@@ -694,6 +1231,10 @@ class PomodoroMacApp(rumps.App):
         
         # Save stats
         self.save_settings()
+        
+        # The rest of the day has moved on, so plan it again
+        self.replan()
+        self.update_tasks_menu()
     
     def generate_beep(self):
         """Generate a simple beep sound as fallback"""
@@ -704,6 +1245,33 @@ class PomodoroMacApp(rumps.App):
             127, 127, 127, 127, 127, 127, 127, 127
         ] * 100)
     
+    def session_event(self):
+        """Describe the session that just finished"""
+        if self.timer_mode == "pomodoro":
+            duration = self.pomodoro_time
+        elif self.timer_mode == "short_break":
+            duration = self.short_break_time
+        else:
+            duration = self.long_break_time
+        
+        task = None
+        if self.timer_mode == "pomodoro" and self.active_task is not None:
+            task = self.tasks[self.active_task]["name"]
+        
+        completed_at = int(time.time())
+        # Pauses make a session longer than its duration, so use when it really started
+        started_at = int(self.session_started) if self.session_started else completed_at - duration
+        return {
+            "id": uuid.uuid4().hex,  # Lets the server ignore resent events
+            "user": self.user_name,
+            "team": self.team,
+            "mode": self.timer_mode,
+            "task": task,
+            "duration": duration,
+            "started_at": started_at,
+            "completed_at": completed_at
+        }
+    
     def format_time(self):
         """Format the current time as MM:SS"""
         mins, secs = divmod(self.current_time, 60)
@@ -724,34 +1292,156 @@ class PomodoroMacApp(rumps.App):
     def add_task(self, _=None):
         # Using rumps window instead of tkinter
         response = rumps.Window(
-            message='Enter a new task:',
+            message='Enter a new task (add ~N for an estimate in pomodoros, !N for priority):',
             title='Add Task',
             default_text='',
             ok='Add',
             cancel='Cancel'
         ).run()
         
-        if response.clicked and response.text:
-            self.tasks.append({
-                "name": response.text.strip(),
-                "completed": False,
-                "created_at": datetime.now().isoformat()
-            })
-            self.save_tasks()
+        if response.clicked and response.text and self.create_task(response.text):
             self.update_tasks_menu()
     
+    def create_task(self, text):
+        """Add a task from text like "Write report ~3 !2"; returns False if empty"""
+        name, estimate, priority = parse_task_input(text)
+        if not name:
+            return False
+        
+        if self.sync:
+            try:
+                record = self.sync.add(name, estimate=estimate, priority=priority)
+            except Exception as e:
+                print(f"Error syncing task: {e}")
+                return False
+            self.tasks.append(record)
+        else:
+            self.tasks.add(name, estimate=estimate, priority=priority)
+        
+        self.planner.add(len(self.tasks) - 1, name, estimate, priority, int(time.time()))
+        self.save_tasks()
+        return True
+    
     def toggle_task_completed(self, task_index):
         if 0 <= task_index < len(self.tasks):
-            self.tasks[task_index]["completed"] = not self.tasks[task_index]["completed"]
+            completed = not self.tasks.is_completed(task_index)
+            if self.sync:
+                try:
+                    self.sync.set_completed(self.tasks[task_index]["id"], completed)
+                except Exception as e:
+                    print(f"Error syncing task: {e}")
+                    return
+            self.tasks.set_completed(task_index, completed)
+            
+            # Hand the task's remaining slots in today's plan to the next tasks
+            if completed:
+                self.planner.complete(task_index, time.time())
+            else:
+                # Keep the task's original creation time so it keeps its place among equal priorities
+                task = self.tasks.record(task_index)
+                self.planner.add(task_index, task["name"], task.get("estimate", 1),
+                                 task.get("priority", 0), task["created_at"])
             self.save_tasks()
             self.update_tasks_menu()
     
     def delete_task(self, task_index):
         if 0 <= task_index < len(self.tasks):
+            if self.sync:
+                try:
+                    self.sync.delete(self.tasks[task_index]["id"])
+                except Exception as e:
+                    print(f"Error syncing task: {e}")
+                    return
             del self.tasks[task_index]
+            self.replan()
+            
+            # Keep the active task pointing at the same task
+            if self.active_task == task_index:
+                self.active_task = None
+            elif self.active_task is not None and self.active_task > task_index:
+                self.active_task -= 1
             self.save_tasks()
             self.update_tasks_menu()
     
+    def set_active_task(self, task_index):
+        """Credit focus time to this task from now on (or stop, if it already is)"""
+        # Time so far belongs to the previously active task
+        if self.timer_running and self.timer_mode == "pomodoro":
+            self.credit_active_task()
+            self.focus_started = time.time()
+        
+        if self.active_task == task_index or not 0 <= task_index < len(self.tasks):
+            self.active_task = None
+        else:
+            self.active_task = task_index
+        self.save_timer_state()
+        self.update_tasks_menu()
+    
+    def credit_active_task(self, finished=False):
+        """Add the focus time since the last credit to the active task"""
+        started, self.focus_started = self.focus_started, None
+        if started is None or self.active_task is None:
+            return
+        
+        seconds = max(0, int(time.time() - started))
+        pomodoros = 1 if finished else 0
+        self.tasks.credit_focus(self.active_task, seconds, pomodoros)
+        if self.sync:
+            try:
+                self.sync.increment(self.tasks[self.active_task]["id"], focus_seconds=seconds, pomodoros=pomodoros)
+            except Exception as e:
+                print(f"Error syncing focus time: {e}")
+        self.save_tasks()
+    
+    def time_report(self):
+        """Lines describing the tasks with the most focus time"""
+        lines = []
+        for index in self.tasks.top_by_focus(10):
+            task = self.tasks[index]
+            hours, minutes = divmod(task["focus_seconds"] // 60, 60)
+            lines.append(f"{task['name']}: {hours}h {minutes:02d}m, {task['pomodoros']} pomodoros")
+        return "\n".join(lines) or "No focus time tracked yet."
+    
+    def show_time_report(self, _=None):
+        rumps.alert("Time Report", self.time_report())
+    
+    def write_exports(self):
+        """Write every recorded session to data/exports as ICS and CSV"""
+        exporter = SessionExporter(self.sessions)
+        paths = []
+        for fmt in ("ics", "csv"):
+            path = os.path.join("data", "exports", f"sessions.{fmt}")
+            exporter.export_file(fmt, path)
+            paths.append(os.path.abspath(path))
+        return paths
+    
+    def export_sessions(self, _=None):
+        """Export focus sessions for calendars and spreadsheets"""
+        try:
+            paths = self.write_exports()
+        except Exception as e:
+            print(f"Error exporting sessions: {e}")
+            rumps.alert("Export Failed", str(e))
+            return
+        rumps.alert("Sessions Exported", "\n".join(paths))
+    
+    def search_history(self, _=None):
+        response = rumps.Window(
+            message='Find archived tasks containing (leave empty for most recent):',
+            title='Search History',
+            default_text='',
+            ok='Search',
+            cancel='Cancel'
+        ).run()
+        
+        if response.clicked:
+            query = response.text.strip()
+            matches = self.archive.search(query) if query else self.archive.recent()
+            if matches:
+                rumps.alert("Task History", "\n".join(f"✓ {task['name']}" for task in matches))
+            else:
+                rumps.alert("Task History", "No archived tasks found.")
+    
     def open_settings(self, _=None):
         # Using rumps window instead of tkinter
         settings_form = rumps.Window(
@@ -776,9 +1466,102 @@ class PomodoroMacApp(rumps.App):
                 
                 self.save_settings()
                 self.reset_timer()
+                self.replan()
             except ValueError:
                 rumps.alert("Error", "Please enter valid numbers for all settings.")
     
+    def replan(self):
+        """Plan open tasks into the pomodoros left before day_end"""
+        self.planner = Planner(self.pomodoro_time, self.short_break_time,
+                               self.long_break_time, self.long_break_interval)
+        try:
+            # Accept "18:00" as well as a bare hour like 18 from a hand-edited file
+            hours, _, minutes = str(self.day_end).partition(":")
+            end = datetime.now().replace(hour=int(hours), minute=int(minutes or 0),
+                                         second=0, microsecond=0).timestamp()
+        except ValueError:
+            end = time.time()
+        
+        self.planner.plan(self.tasks.open_tasks(), time.time(), end, self.pomodoro_count)
+    
+    def remaining_time(self):
+        """Whole seconds left until the running timer's deadline"""
+        return max(0, round(self.deadline - time.time()))
+    
+    def save_timer_state(self):
+        """Checkpoint the timer so a session survives a crash or logout
+        
+        Only called when the timer starts, pauses or switches mode, never
+        on every tick.
+        """
+        state = {"mode": self.timer_mode, "running": self.timer_running}
+        if self.timer_running:
+            state["deadline"] = self.deadline
+        else:
+            state["remaining"] = self.current_time
+        if self.focus_started is not None:
+            state["focus_started"] = self.focus_started
+        if self.session_started is not None:
+            state["session_started"] = self.session_started
+        if self.active_task is not None:
+            task = self.tasks.record(self.active_task)
+            state["active_task"] = {"index": self.active_task, "id": task.get("id"),
+                                    "name": task["name"], "created_at": task["created_at"]}
+        
+        try:
+            # Write then rename so a crash can't leave a half-written file
+            with open("data/timer.json.tmp", "w") as f:
+                json.dump(state, f)
+            os.replace("data/timer.json.tmp", "data/timer.json")
+        except:
+            # Silently fail if can't save the timer
+            pass
+    
+    def restore_timer(self):
+        """Restore the timer checkpoint; returns True if it was running"""
+        try:
+            if not os.path.exists("data/timer.json"):
+                return False
+            with open("data/timer.json", "r") as f:
+                state = json.load(f)
+            
+            self.timer_mode = state.get("mode", self.timer_mode)
+            self.active_task = self.find_task(state.get("active_task"))
+            self.session_started = state.get("session_started")
+            if state.get("running"):
+                # Time kept passing while the app wasn't running
+                self.deadline = state["deadline"]
+                self.current_time = self.remaining_time()
+                if state.get("focus_started") is not None:
+                    # Don't count time past a deadline that went by while the app was closed
+                    self.focus_started = state["focus_started"] + max(0, time.time() - self.deadline)
+                return True
+            self.current_time = state.get("remaining", self.current_time)
+        except:
+            # Silently fail if can't load the timer
+            pass
+        return False
+    
+    def find_task(self, ref):
+        """Index of the task a timer checkpoint refers to, or None if it's gone"""
+        if not ref:
+            return None
+        if ref.get("id"):
+            return self.tasks.index_of(ref["id"])
+        
+        # Archiving at startup can shift indices, so make sure it's the same task
+        def matches(index):
+            task = self.tasks.record(index)
+            return task["name"] == ref.get("name") and task["created_at"] == ref.get("created_at")
+        
+        index = ref.get("index")
+        if isinstance(index, int) and 0 <= index < len(self.tasks) and matches(index):
+            return index
+        for index in range(len(self.tasks)):
+            if matches(index):
+                return index
+        return None
+    
     def save_settings(self):
         """Save settings to a file"""
         settings = {
@@ -786,7 +1569,14 @@ class PomodoroMacApp(rumps.App):
             "short_break_time": self.short_break_time,
             "long_break_time": self.long_break_time,
             "long_break_interval": self.long_break_interval,
-            "pomodoro_count": self.pomodoro_count
+            "pomodoro_count": self.pomodoro_count,
+            "archive_after_days": self.archive_after_days,
+            "user_name": self.user_name,
+            "team": self.team,
+            "outbox_url": self.outbox_url,
+            "sync_enabled": self.sync_enabled,
+            "hooks": self.hook_configs,
+            "day_end": self.day_end
         }
         
         try:
@@ -808,30 +1598,113 @@ class PomodoroMacApp(rumps.App):
                 self.long_break_time = settings.get("long_break_time", self.long_break_time)
                 self.long_break_interval = settings.get("long_break_interval", self.long_break_interval)
                 self.pomodoro_count = settings.get("pomodoro_count", self.pomodoro_count)
+                self.archive_after_days = settings.get("archive_after_days", self.archive_after_days)
+                self.user_name = settings.get("user_name", self.user_name)
+                self.team = settings.get("team", self.team)
+                self.outbox_url = settings.get("outbox_url", self.outbox_url)
+                self.sync_enabled = settings.get("sync_enabled", self.sync_enabled)
+                self.hook_configs = settings.get("hooks", self.hook_configs)
+                self.day_end = settings.get("day_end", self.day_end)
         except:
             # Silently fail if can't load settings
             pass
     
     def save_tasks(self):
         """Save tasks to a file"""
+        if self.sync:
+            # Changes are already in this device's sync log; rewriting the
+            # shared tasks.json would clobber other devices' edits
+            return
+        
         try:
             with open("data/tasks.json", "w") as f:
-                json.dump(self.tasks, f)
+                json.dump(self.tasks.to_records(), f)
         except:
             # Silently fail if can't save tasks
             pass
     
     def load_tasks(self):
         """Load tasks from file"""
+        if self.sync:
+            self.load_synced_tasks()
+            return
+        
         try:
             if os.path.exists("data/tasks.json"):
                 with open("data/tasks.json", "r") as f:
-                    self.tasks = json.load(f)
+                    self.tasks = TaskList.from_records(json.load(f))
         except:
             # Silently fail if can't load tasks
             pass
+        
+        self.archive_tasks()
+    
+    def archive_tasks(self):
+        """Move tasks completed more than archive_after_days ago to the archive"""
+        cutoff = time.time() - self.archive_after_days * 24 * 60 * 60
+        archived = self.tasks.completed_before(cutoff)
+        if archived:
+            try:
+                # Write the archive first so a crash can't lose tasks
+                self.archive.append(archived)
+            except Exception as e:
+                # Keep the tasks active and try again next start
+                print(f"Error archiving tasks: {e}")
+                return
+            self.tasks.pop_completed_before(cutoff)
+            self.save_tasks()
+    
+    def device_id(self):
+        """Name of this device's sync log, generated once per user and machine"""
+        return load_device_id("~/.pomodoro_device_id")
+    
+    def load_synced_tasks(self):
+        """Build the task list from the merged sync logs"""
+        try:
+            self.sync.load()
+            
+            # The first device to enable sync seeds the logs with its tasks.json
+            if not self.sync.clock and os.path.exists("data/tasks.json"):
+                with open("data/tasks.json", "r") as f:
+                    existing = TaskList.from_records(json.load(f))
+                for record in existing.to_records():
+                    self.sync.import_record(record)
+            
+            self.tasks = TaskList.from_records(self.sync.records())
+        except Exception as e:
+            print(f"Error loading synced tasks: {e}")
+    
+    def pull_sync(self, _=None):
+        """Merge task changes made on other devices"""
+        try:
+            if self.sync.pull():
+                active_id = self.tasks[self.active_task]["id"] if self.active_task is not None else None
+                self.tasks = TaskList.from_records(self.sync.records())
+                self.active_task = self.tasks.index_of(active_id) if active_id else None
+                self.replan()
+                self.update_tasks_menu()
+        except Exception as e:
+            print(f"Sync error: {e}")
     
     def quit_app(self, _=None):
+        # Credit the focus time so far; the checkpoint carries the session on
+        if self.timer_running and self.timer_mode == "pomodoro":
+            self.credit_active_task()
+            self.focus_started = time.time()
+        self.save_timer_state()
+        if self.sync:
+            try:
+                self.sync.snapshot()
+            except OSError as e:
+                print(f"Error saving sync snapshot: {e}")
+        if self.outbox:
+            self.outbox.stop()
+        self.hooks.shutdown()
+        if self.hooks.hooks:
+            try:
+                self.hooks.save_stats("data/hook_stats.json")
+            except OSError as e:
+                print(f"Error saving hook stats: {e}")
         rumps.quit_application()
 
 if __name__ == "__main__":
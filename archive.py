@@ -0,0 +1,52 @@
+import json
+import os
+from collections import deque
+
+
+class TaskArchive:
+    """Append-only store for completed tasks that are no longer active
+
+    Archived tasks are written one JSON object per line to
+    data/archive.jsonl. Nothing is read at startup; the file is only
+    streamed line by line when history is browsed or searched, so the
+    active task list stays small no matter how much history builds up.
+    """
+
+    def __init__(self, path="data/archive.jsonl"):
+        self.path = path
+
+    def append(self, records):
+        """Append task dicts to the archive"""
+        with open(self.path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __iter__(self):
+        """Stream archived tasks, oldest first"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Skip a partially written last line
+                    continue
+
+    def recent(self, limit=20):
+        """Return the `limit` most recently archived tasks, newest first"""
+        return list(reversed(deque(self, maxlen=limit)))
+
+    def search(self, query, limit=20):
+        """Return up to `limit` archived tasks whose name contains `query`"""
+        query = query.lower()
+        matches = deque(maxlen=limit)
+        for record in self:
+            if query in record.get("name", "").lower():
+                matches.append(record)
+        return list(reversed(matches))
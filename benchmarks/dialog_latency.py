@@ -0,0 +1,66 @@
+"""Measure how long the prewarmed dialogs take to appear
+
+Opens and closes the quick-entry and settings windows repeatedly and
+reports the time from show() until the window is mapped on screen.
+Needs a display (on Linux without one, run it under xvfb-run).
+
+    python benchmarks/dialog_latency.py [--runs 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dialogs import OPEN_LATENCY_BUDGET, QuickEntryWindow, SettingsWindow
+
+
+def measure(root, window, show, runs):
+    latencies = []
+    for _ in range(runs):
+        window.last_open_latency = None
+        show()
+        deadline = time.monotonic() + 2
+        while window.last_open_latency is None and time.monotonic() < deadline:
+            root.update()
+        if window.last_open_latency is None:
+            raise RuntimeError(f"{window.window.title()} window was never mapped")
+        latencies.append(window.last_open_latency)
+        window.hide()
+        root.update()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dialog open latency")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    root.withdraw()
+    task_window = QuickEntryWindow(root, lambda text: None)
+    settings_window = SettingsWindow(root, [
+        ("pomodoro", "Pomodoro (minutes):"),
+        ("short_break", "Short Break (minutes):"),
+        ("long_break", "Long Break (minutes):"),
+        ("interval", "Long Break Interval:")
+    ], lambda values: None)
+    values = {"pomodoro": 25, "short_break": 5, "long_break": 15, "interval": 4}
+
+    worst = 0
+    for window, show in ((task_window, task_window.show), (settings_window, lambda: settings_window.show(values))):
+        latencies = measure(root, window, show, args.runs)
+        worst = max(worst, max(latencies))
+        print(f"{window.window.title():>8}: median {statistics.median(latencies) * 1000:5.1f} ms, "
+              f"max {max(latencies) * 1000:5.1f} ms over {args.runs} opens")
+    root.destroy()
+
+    if worst > OPEN_LATENCY_BUDGET:
+        sys.exit(f"expected every open under {OPEN_LATENCY_BUDGET * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
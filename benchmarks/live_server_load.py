@@ -0,0 +1,165 @@
+"""Load generator for live_server.py
+
+Starts the live server on a scratch data directory, opens thousands of
+idle WebSocket connections to it and reports how much the server's
+resident memory grew per connection. It then starts the timer from one
+connection and checks that a sample of the idle clients receive the
+broadcast.
+
+    python benchmarks/live_server_load.py [--connections 10000]
+
+The client and the server each need a file descriptor per connection,
+so the open file limit (ulimit -n) must be above the connection count.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import resource
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def server_rss(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("no VmRSS")
+
+
+def masked_frame(message):
+    """Build a masked client-to-server text frame"""
+    payload = json.dumps(message).encode("utf-8")
+    mask = os.urandom(4)
+    masked = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return struct.pack("!BB", 0x81, 0x80 | len(payload)) + mask + masked
+
+
+async def read_frame(reader):
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    return first & 0x0F, await reader.readexactly(length)
+
+
+async def connect(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    writer.write((
+        "GET / HTTP/1.1\r\n"
+        f"Host: 127.0.0.1:{port}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\n"
+        "Sec-WebSocket-Version: 13\r\n\r\n"
+    ).encode("ascii"))
+    response = await reader.readuntil(b"\r\n\r\n")
+    if not response.startswith(b"HTTP/1.1 101"):
+        raise RuntimeError(f"handshake failed: {response[:40]!r}")
+    return reader, writer
+
+
+async def wait_for_running(reader, timeout):
+    """Read frames until a timer message says the timer is running"""
+    async def read():
+        while True:
+            opcode, payload = await read_frame(reader)
+            message = json.loads(payload)
+            if message.get("type") == "timer" and message.get("running"):
+                return True
+    try:
+        return await asyncio.wait_for(read(), timeout)
+    except asyncio.TimeoutError:
+        return False
+
+
+async def wait_for_server(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await connect(port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("live server did not start")
+
+
+async def run(args, pid):
+    await wait_for_server(args.port)
+    await asyncio.sleep(0.5)
+    before = server_rss(pid)
+
+    semaphore = asyncio.Semaphore(500)
+
+    async def open_one():
+        async with semaphore:
+            return await connect(args.port)
+
+    start = time.monotonic()
+    clients = await asyncio.gather(*(open_one() for _ in range(args.connections)))
+    connect_seconds = time.monotonic() - start
+    await asyncio.sleep(2)
+    after = server_rss(pid)
+
+    per_connection = (after - before) / args.connections
+    print(f"{args.connections} idle connections opened in {connect_seconds:.1f} s")
+    print(f"server RSS {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB, "
+          f"{per_connection / 1024:.2f} KB per connection")
+
+    # Start the timer from one client; every client should hear about it
+    sample = random.sample(clients, min(args.sample, len(clients)))
+    control_reader, control_writer = clients[0]
+    control_writer.write(masked_frame({"action": "start"}))
+    received = await asyncio.gather(*(wait_for_running(reader, 10) for reader, writer in sample))
+    print(f"{sum(received)}/{len(sample)} sampled clients received the broadcast")
+
+    control_writer.write(masked_frame({"action": "reset"}))
+    for reader, writer in clients:
+        writer.close()
+    return per_connection, all(received)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live server load generator")
+    parser.add_argument("--port", type=int, default=8877)
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--sample", type=int, default=100)
+    parser.add_argument("--max-kb-per-connection", type=float, default=8)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if hard <= args.connections + 100:
+        sys.exit(f"open file limit {hard} is too low for {args.connections} connections")
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "live_server.py"),
+                                   "--port", str(args.port), "--data", directory],
+                                  stdout=subprocess.DEVNULL)
+        try:
+            per_connection, delivered = asyncio.run(run(args, server.pid))
+        finally:
+            server.terminate()
+            server.wait()
+
+    if not delivered:
+        sys.exit("some clients missed the broadcast")
+    if per_connection > args.max_kb_per_connection * 1024:
+        sys.exit(f"expected at most {args.max_kb_per_connection} KB per connection")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Time planning a large backlog into a day of pomodoros
+
+Plans 50k open tasks (random estimates and priorities) into a 9:00-18:00
+window straight from a TaskList, the way the app's replan() does, then
+times the incremental re-plan after completing tasks.
+
+    python benchmarks/planner_speed.py [--tasks 50000] [--runs 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from planner import Planner
+from tasks import TaskList
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planner speed check")
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    now = int(time.time())
+    tasks = TaskList({"name": f"Task {i}", "completed": i % 10 == 0, "created_at": now - i,
+                      "estimate": rng.randint(1, 8), "priority": rng.randint(-5, 5)}
+                     for i in range(args.tasks))
+    start = now - now % 86400 + 9 * 3600
+    end = start + 9 * 3600
+
+    timings = []
+    for _ in range(args.runs):
+        planner = Planner(25 * 60, 5 * 60, 15 * 60, 4)
+        t = time.perf_counter()
+        planner.plan(tasks.open_tasks(), start, end)
+        timings.append(time.perf_counter() - t)
+
+    completes = []
+    for slot_start, slot_end, key, name in planner.schedule()[:5]:
+        t = time.perf_counter()
+        planner.complete(key, start)
+        completes.append(time.perf_counter() - t)
+
+    plan_ms = statistics.median(timings) * 1000
+    print(f"plan {args.tasks} tasks: median {plan_ms:.1f} ms, max {max(timings) * 1000:.1f} ms "
+          f"({len(planner.schedule())} slots planned)")
+    print(f"complete + refill: max {max(completes) * 1000:.2f} ms")
+    if plan_ms > args.budget_ms:
+        sys.exit(f"expected planning under {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Compare the memory used by 1M tasks as dicts and as a TaskList
+
+Each variant is built in a fresh process and the growth of its resident
+set size is reported. Every task gets its own name, like a real backlog,
+so the numbers don't benefit from identical strings being shared.
+
+Each process then times a full pass over task["completed"], the way a
+menu rebuild reads it, so a per-row lookup that grows with the list
+shows up as a scan far slower than the dicts.
+
+    python benchmarks/task_memory.py [--count 1000000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUILD = {
+    "dicts": """
+from datetime import datetime
+tasks = [{"name": name(i), "completed": i % 3 == 0, "created_at": datetime.now().isoformat()}
+         for i in range(COUNT)]
+""",
+    "tasklist": """
+import time
+from tasks import TaskList
+now = int(time.time())
+tasks = TaskList(({"name": name(i), "completed": i % 3 == 0, "created_at": now - i}
+                  for i in range(COUNT)))
+"""
+}
+
+SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * {page_size}
+
+def name(i):
+    return f"Review pull request #{{i}} for the billing exporter"
+
+COUNT = {count}
+before = rss()
+{build}
+grown = rss() - before
+
+import time
+start = time.perf_counter()
+done = sum(1 for task in tasks if task["completed"])
+print(grown, time.perf_counter() - start)
+"""
+
+
+def measure(variant, count):
+    script = SCRIPT.format(root=ROOT, page_size=os.sysconf("SC_PAGE_SIZE"),
+                           count=count, build=BUILD[variant])
+    memory, seconds = subprocess.check_output([sys.executable, "-c", script]).split()
+    return int(memory), float(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Task list memory benchmark")
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--min-ratio", type=float, default=3.0)
+    parser.add_argument("--max-scan-slowdown", type=float, default=20.0)
+    args = parser.parse_args()
+
+    dicts, dicts_scan = measure("dicts", args.count)
+    tasklist, tasklist_scan = measure("tasklist", args.count)
+    ratio = dicts / tasklist
+    print(f"{args.count} tasks as dicts:    {dicts / 1e6:7.1f} MB ({dicts / args.count:.0f} bytes/task)")
+    print(f"{args.count} tasks in TaskList: {tasklist / 1e6:7.1f} MB ({tasklist / args.count:.0f} bytes/task)")
+    print(f"{ratio:.1f}x less memory")
+    slowdown = tasklist_scan / dicts_scan
+    print(f"scan of task[\"completed\"]: dicts {dicts_scan * 1000:.0f} ms, "
+          f"TaskList {tasklist_scan * 1000:.0f} ms ({slowdown:.1f}x)")
+    if ratio < args.min_ratio:
+        sys.exit(f"expected at least {args.min_ratio}x")
+    if slowdown > args.max_scan_slowdown:
+        sys.exit(f"expected the scan at most {args.max_scan_slowdown}x slower than dicts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Load test for team_server.py
+
+Starts the server in its own process pinned to a single CPU, then posts
+gzip-compressed batches of session events from several client processes
+over kept-alive connections, the way the app's outbox does, and reports
+the sustained event rate.
+
+    python benchmarks/team_server_load.py [--seconds 10] [--clients 4] [--batch 100]
+"""
+import argparse
+import gzip
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pin_to_one_cpu():
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+
+def wait_for_server(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("team server did not start")
+
+
+def client(port, client_id, batch, seconds, results):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    now = int(time.time())
+    sent = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        events = [{"id": uuid.uuid4().hex, "user": f"user{client_id}-{i % 20}", "team": f"team{i % 5}",
+                   "mode": "pomodoro" if i % 4 else "short_break", "duration": 1500,
+                   "completed_at": now} for i in range(batch)]
+        connection.request("POST", "/events", gzip.compress(json.dumps(events).encode("utf-8")), headers)
+        response = connection.getresponse()
+        body = json.loads(response.read())
+        if response.status != 200 or body["accepted"] != batch:
+            raise RuntimeError(f"unexpected response {response.status}: {body}")
+        sent += batch
+    connection.close()
+    results.put(sent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Team server load test")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--min-rate", type=float, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "team_server.py"),
+             "--port", str(args.port), "--db", os.path.join(directory, "team.db")],
+            stdout=subprocess.DEVNULL, preexec_fn=pin_to_one_cpu)
+        try:
+            wait_for_server(args.port)
+            results = multiprocessing.Queue()
+            workers = [multiprocessing.Process(target=client, args=(args.port, i, args.batch, args.seconds, results))
+                       for i in range(args.clients)]
+            start = time.monotonic()
+            for worker in workers:
+                worker.start()
+            total = sum(results.get() for _ in workers)
+            for worker in workers:
+                worker.join()
+            elapsed = time.monotonic() - start
+        finally:
+            server.terminate()
+            server.wait()
+
+    rate = total / elapsed
+    print(f"{total} events in {elapsed:.1f} s from {args.clients} clients: {rate:.0f} events/s")
+    if rate < args.min_rate:
+        sys.exit(f"expected at least {args.min_rate:.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import time
+import tkinter as tk
+
+OPEN_LATENCY_BUDGET = 0.03  # Seconds a prewarmed window may take to appear
+
+
+class PrewarmedWindow:
+    """Toplevel window that is built once, kept hidden and shown on demand
+
+    Building a Toplevel and its widgets is the slow part of opening a
+    dialog, so it happens once at startup. show() only refreshes values
+    and maps the window. The window is not modal and never runs its own
+    event loop, so the timer keeps updating while it is open.
+
+    Open latency is measured from show() until Tk reports the window as
+    mapped on screen, and kept in `last_open_latency`.
+    """
+
+    def __init__(self, root, title):
+        self.root = root
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.resizable(False, False)
+        self.window.withdraw()
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+        self.window.bind("<Escape>", lambda event: self.hide())
+        self.window.bind("<Map>", self.on_map, add="+")
+        self.opened_at = None
+        self.last_open_latency = None
+
+    def prepare(self):
+        """Finish laying out the widgets so the first show() is fast too"""
+        self.window.update_idletasks()
+
+    def refresh(self, *args):
+        """Update the widgets before the window is shown"""
+
+    def show(self, *args):
+        if not self.window.winfo_ismapped():
+            self.opened_at = time.perf_counter()
+        self.refresh(*args)
+        self.window.deiconify()
+        self.window.lift()
+        self.window.focus_force()
+
+    def on_map(self, event):
+        """Record how long the window took to appear after show()"""
+        # Child widgets' <Map> events reach the toplevel's bindings too
+        if event.widget is not self.window or self.opened_at is None:
+            return
+        self.last_open_latency = time.perf_counter() - self.opened_at
+        self.opened_at = None
+        if self.last_open_latency > OPEN_LATENCY_BUDGET:
+            print(f"{self.window.title()} window took {self.last_open_latency * 1000:.0f} ms to open")
+
+    def hide(self):
+        self.window.withdraw()
+
+
+class QuickEntryWindow(PrewarmedWindow):
+    """Single-line entry for adding a task"""
+
+    def __init__(self, root, on_submit):
+        super().__init__(root, "Add Task")
+        self.on_submit = on_submit
+
+        tk.Label(self.window, text="Enter a new task (~N pomodoros, !N priority):").grid(row=0, column=0, columnspan=2, sticky="w", padx=10, pady=5)
+        self.entry = tk.Entry(self.window, width=30)
+        self.entry.grid(row=1, column=0, padx=10, pady=5)
+        self.entry.bind("<Return>", lambda event: self.submit())
+        tk.Button(self.window, text="Add", command=self.submit).grid(row=1, column=1, padx=10, pady=5)
+        self.prepare()
+
+    def refresh(self):
+        self.entry.delete(0, tk.END)
+
+    def show(self):
+        super().show()
+        self.entry.focus_set()
+
+    def submit(self):
+        text = self.entry.get()
+        self.hide()
+        self.on_submit(text)
+
+
+class SettingsWindow(PrewarmedWindow):
+    """Form with one entry per setting
+
+    `fields` is a list of (key, label) pairs. show() takes a dict of the
+    current values by key, and on_save receives a dict of the entered
+    strings; it returns False to keep the window open.
+    """
+
+    def __init__(self, root, fields, on_save):
+        super().__init__(root, "Settings")
+        self.on_save = on_save
+        self.entries = {}
+
+        for row, (key, label) in enumerate(fields):
+            tk.Label(self.window, text=label).grid(row=row, column=0, sticky="w", padx=10, pady=5)
+            entry = tk.Entry(self.window, width=10)
+            entry.grid(row=row, column=1, padx=10, pady=5)
+            self.entries[key] = entry
+
+        tk.Button(self.window, text="Save", command=self.save).grid(row=len(fields), column=0, columnspan=2, pady=20)
+        self.window.bind("<Return>", lambda event: self.save())
+        self.prepare()
+
+    def refresh(self, values):
+        for key, entry in self.entries.items():
+            entry.delete(0, tk.END)
+            entry.insert(0, str(values.get(key, "")))
+
+    def save(self):
+        values = {key: entry.get() for key, entry in self.entries.items()}
+        if self.on_save(values) is not False:
+            self.hide()
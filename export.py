@@ -0,0 +1,188 @@
+"""Export recorded focus sessions as an iCalendar (.ics) or CSV file
+
+Output is produced by generators, one session at a time. Every month
+that is over is rendered once into data/exports/<format>/YYYY-MM.<format>
+and reused on later exports, so only the current month is rendered again
+and exporting years of history is mostly copying cached chunks.
+
+    python export.py ics focus.ics
+    python export.py csv focus.csv
+"""
+import argparse
+import csv
+import io
+import os
+import shutil
+import sys
+import time
+
+from sessions import SessionLog
+
+FORMATS = ("ics", "csv")
+CSV_COLUMNS = ("id", "mode", "task", "start", "end", "duration_seconds", "user", "team")
+MODE_TITLES = {"pomodoro": "Pomodoro", "short_break": "Short Break", "long_break": "Long Break"}
+
+
+def ics_time(timestamp):
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(timestamp))
+
+
+def ics_text(text):
+    """Escape text for an iCalendar property value"""
+    return (text.replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def ics_line(line):
+    """Fold a content line at 75 octets as RFC 5545 requires"""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74
+        # Don't split a multi-byte character
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+    parts.append(data.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def session_times(session):
+    end = session["completed_at"]
+    start = session.get("started_at") or end - session.get("duration", 0)
+    return start, end
+
+
+def iter_ics_events(sessions):
+    """Yield one VEVENT block per session"""
+    for session in sessions:
+        start, end = session_times(session)
+        summary = MODE_TITLES.get(session.get("mode"), "Session")
+        if session.get("task"):
+            summary += f": {session['task']}"
+
+        yield "".join((
+            "BEGIN:VEVENT\r\n",
+            ics_line(f"UID:{session.get('id') or ics_time(end)}@pomodoro"),
+            f"DTSTAMP:{ics_time(end)}\r\n",
+            f"DTSTART:{ics_time(start)}\r\n",
+            f"DTEND:{ics_time(end)}\r\n",
+            ics_line(f"SUMMARY:{ics_text(summary)}"),
+            "END:VEVENT\r\n"
+        ))
+
+
+def iter_csv_rows(sessions):
+    """Yield one CSV line per session"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for session in sessions:
+        start, end = session_times(session)
+        writer.writerow((
+            session.get("id", ""),
+            session.get("mode", ""),
+            session.get("task") or "",
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(start)),
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(end)),
+            # Time on the clock; with pauses, end - start is longer than this
+            session.get("duration", end - start),
+            session.get("user", ""),
+            session.get("team", "")
+        ))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def ics_header():
+    return "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Pomodoro//Focus Sessions//EN\r\n"
+
+
+def ics_footer():
+    return "END:VCALENDAR\r\n"
+
+
+def csv_header():
+    return ",".join(CSV_COLUMNS) + "\r\n"
+
+
+class SessionExporter:
+    """Builds exports from monthly chunks, caching the months that are over"""
+
+    def __init__(self, log=None, cache_dir="data/exports"):
+        self.log = log or SessionLog()
+        self.cache_dir = cache_dir
+
+    def render(self, month, fmt):
+        """Stream the body of one month in the given format"""
+        sessions = self.log.sessions(month)
+        if fmt == "ics":
+            return iter_ics_events(sessions)
+        return iter_csv_rows(sessions)
+
+    def chunk_path(self, month, fmt):
+        """Return the cached chunk for a month that is over, building it if needed"""
+        path = os.path.join(self.cache_dir, fmt, f"{month}.{fmt}")
+        source = self.log.path(month)
+
+        # A session finishing right at midnight can still land in last
+        # month's file, so rebuild if the source changed after the chunk
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", newline="") as f:
+            f.writelines(self.render(month, fmt))
+        os.replace(tmp_path, path)
+        return path
+
+    def export(self, fmt, out):
+        """Write a full export to the text file object `out`"""
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown export format {fmt!r}")
+
+        current_month = time.strftime("%Y-%m")
+        out.write(ics_header() if fmt == "ics" else csv_header())
+        for month in self.log.months():
+            if month < current_month:
+                with open(self.chunk_path(month, fmt), "r", newline="") as chunk:
+                    shutil.copyfileobj(chunk, out)
+            else:
+                out.writelines(self.render(month, fmt))
+        if fmt == "ics":
+            out.write(ics_footer())
+
+    def export_file(self, fmt, path):
+        """Write a full export to `path`"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", newline="") as f:
+            self.export(fmt, f)
+        os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export pomodoro sessions")
+    parser.add_argument("format", choices=FORMATS)
+    parser.add_argument("output", nargs="?", help="file to write (default: stdout)")
+    parser.add_argument("--data", default="data", help="directory with the sessions/ folder")
+    args = parser.parse_args()
+
+    exporter = SessionExporter(SessionLog(os.path.join(args.data, "sessions")),
+                               os.path.join(args.data, "exports"))
+    if args.output:
+        exporter.export_file(args.format, args.output)
+    else:
+        sys.stdout.reconfigure(newline="")
+        exporter.export(args.format, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
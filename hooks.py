@@ -0,0 +1,148 @@
+import json
+import os
+import subprocess
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HookRunner:
+    """Run user-configured actions when a timer completes, off the UI thread
+
+    Hooks come from the "hooks" list in data/settings.json, e.g.
+
+        {"name": "dnd-off", "command": "./scripts/dnd.sh off", "on": ["pomodoro"], "timeout": 5}
+        {"name": "chat", "url": "http://localhost:9000/post", "timeout": 3}
+
+    A hook either runs a shell command (the session event is passed as JSON
+    on stdin and as POMODORO_* environment variables) or POSTs the event as
+    JSON to a URL. "on" limits a hook to the modes whose completion should
+    trigger it; without it the hook runs after every session.
+
+    fire() only queues work on a small thread pool and returns immediately.
+    Each hook is killed or abandoned after its timeout, and once
+    `max_queue` hooks are waiting new ones are dropped instead of piling
+    up behind a stuck hook.
+    """
+
+    def __init__(self, hooks, max_workers=2, max_queue=16, default_timeout=10):
+        self.hooks = self.valid_hooks(hooks)
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hook")
+
+        self.lock = threading.Lock()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.dropped = 0
+        self.hook_stats = {}
+
+    def valid_hooks(self, hooks):
+        """Keep the hook entries that can run; settings are hand-edited"""
+        if not isinstance(hooks, list):
+            if hooks:
+                print(f"Ignoring hooks setting: expected a list, got {type(hooks).__name__}")
+            return []
+
+        valid = []
+        for hook in hooks:
+            if not isinstance(hook, dict) or not (isinstance(hook.get("command"), str) or isinstance(hook.get("url"), str)):
+                print(f"Ignoring invalid hook: {hook!r}")
+                continue
+            valid.append(hook)
+        return valid
+
+    def fire(self, event):
+        """Queue every hook that applies to `event`; never blocks"""
+        for hook in self.hooks:
+            modes = hook.get("on")
+            if isinstance(modes, str):
+                modes = [modes]
+            if modes and event.get("mode") not in modes:
+                continue
+
+            with self.lock:
+                if self.queue_depth >= self.max_queue:
+                    self.dropped += 1
+                    print(f"Hook queue full, skipping {self.hook_name(hook)}")
+                    continue
+                self.queue_depth += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+            self.executor.submit(self.run_hook, hook, event, time.monotonic())
+
+    def run_hook(self, hook, event, queued_at):
+        started_at = time.monotonic()
+        status = "ok"
+        try:
+            timeout = hook.get("timeout", self.default_timeout)
+            if hook.get("command"):
+                self.run_command(hook["command"], event, timeout)
+            else:
+                self.post(hook["url"], event, timeout)
+        except (subprocess.TimeoutExpired, TimeoutError):
+            status = "timeout"
+        except Exception as e:
+            status = "error"
+            print(f"Hook {self.hook_name(hook)} failed: {e}")
+        finally:
+            finished_at = time.monotonic()
+            with self.lock:
+                self.queue_depth -= 1
+                self.record(hook, status, started_at - queued_at, finished_at - started_at)
+
+    def run_command(self, command, event, timeout):
+        env = dict(os.environ)
+        for key, value in event.items():
+            env[f"POMODORO_{key.upper()}"] = str(value)
+
+        result = subprocess.run(command, shell=True, input=json.dumps(event), text=True,
+                                env=env, timeout=timeout, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"exit status {result.returncode}: {result.stderr.strip()}")
+
+    def post(self, url, event, timeout):
+        request = urllib.request.Request(url, data=json.dumps(event).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+    def hook_name(self, hook):
+        return hook.get("name") or hook.get("command") or hook.get("url")
+
+    def record(self, hook, status, wait, duration):
+        stats = self.hook_stats.setdefault(self.hook_name(hook), {
+            "runs": 0, "errors": 0, "timeouts": 0,
+            "last_seconds": 0.0, "max_seconds": 0.0, "total_seconds": 0.0, "max_wait_seconds": 0.0
+        })
+        stats["runs"] += 1
+        if status == "error":
+            stats["errors"] += 1
+        elif status == "timeout":
+            stats["timeouts"] += 1
+        stats["last_seconds"] = duration
+        stats["max_seconds"] = max(stats["max_seconds"], duration)
+        stats["total_seconds"] += duration
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait)
+
+    def stats(self):
+        """Snapshot of queue depth and per-hook latency"""
+        with self.lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "dropped": self.dropped,
+                "hooks": {name: dict(stats) for name, stats in self.hook_stats.items()}
+            }
+
+    def save_stats(self, path):
+        """Write stats() to a JSON file, e.g. data/hook_stats.json"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.stats(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def shutdown(self):
+        """Stop accepting hooks without waiting for running ones"""
+        self.executor.shutdown(wait=False)
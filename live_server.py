@@ -0,0 +1,592 @@
+"""Live timer server for office screens and web dashboards
+
+Runs the pomodoro timer on an asyncio loop and pushes every change to
+connected browsers and kiosks over WebSockets. Clients receive JSON
+messages of two types:
+
+    {"type": "timer", "mode": "pomodoro", "time": 1499, "running": true, "pomodoro_count": 3}
+    {"type": "tasks", "tasks": [{"name": "...", "completed": false, ...}, ...]}
+
+and can control the timer by sending commands:
+
+    {"action": "start"} / {"action": "pause"} / {"action": "reset"}
+    {"action": "mode", "mode": "short_break"}
+    {"action": "add_task", "name": "Write report ~2"}
+    {"action": "toggle_task", "index": 0} / {"action": "delete_task", "index": 0}
+
+Run it with:
+
+    python live_server.py --port 8766
+
+With "sync_enabled" in settings.json the server is one more device in
+the task sync (see sync.py): it merges the tray apps' task changes and
+its own edits reach them through its log in data/sync/. Without sync it
+reads and rewrites tasks.json, so don't point it at the data directory
+of a tray app that is running; give it its own with --data. Finished
+sessions are appended to data/sessions/ either way, so exports include
+them.
+"""
+import argparse
+import asyncio
+import base64
+import getpass
+import hashlib
+import json
+import os
+import struct
+import time
+import uuid
+
+from sessions import SessionLog
+from sync import SyncReplica, load_device_id
+from tasks import TaskList, parse_task_input
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_HANDSHAKE_SIZE = 8 * 1024
+MAX_MESSAGE_SIZE = 64 * 1024
+WRITE_BUFFER_LIMIT = 64 * 1024  # Bytes queued for a client before it counts as slow
+SYNC_INTERVAL = 30  # Seconds between checks for task changes from other devices
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+def encode_frame(payload, opcode=OP_TEXT):
+    """Build a single unmasked server-to-client WebSocket frame"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def close_frame(code):
+    return encode_frame(struct.pack("!H", code), OP_CLOSE)
+
+
+class TimerState:
+    """The pomodoro state machine from the tray app, driven by an event loop
+
+    `on_change(kind)` is called with "timer" or "tasks" whenever that part
+    of the state changes.
+    """
+
+    def __init__(self, on_change, data_dir="data"):
+        self.on_change = on_change
+        self.data_dir = data_dir
+
+        self.pomodoro_time = 25 * 60
+        self.short_break_time = 5 * 60
+        self.long_break_time = 15 * 60
+        self.long_break_interval = 4
+
+        self.timer_mode = "pomodoro"
+        self.timer_running = False
+        self.deadline = None
+        self.session_started = None  # When the current session was first started
+        self.pomodoro_count = 0
+        self.user_name = getpass.getuser()
+        self.team = ""
+        self.tasks = TaskList()
+        self.sync = None
+        self.sessions = SessionLog(os.path.join(data_dir, "sessions"))
+        self.ticker = None
+
+        self.load()
+        self.current_time = self.mode_duration()
+
+    def load(self):
+        """Load durations and tasks the same way the tray app does"""
+        settings = {}
+        try:
+            with open(os.path.join(self.data_dir, "settings.json"), "r") as f:
+                settings = json.load(f)
+            self.pomodoro_time = settings.get("pomodoro_time", self.pomodoro_time)
+            self.short_break_time = settings.get("short_break_time", self.short_break_time)
+            self.long_break_time = settings.get("long_break_time", self.long_break_time)
+            self.long_break_interval = settings.get("long_break_interval", self.long_break_interval)
+            self.pomodoro_count = settings.get("pomodoro_count", self.pomodoro_count)
+            self.user_name = settings.get("user_name", self.user_name)
+            self.team = settings.get("team", self.team)
+        except (OSError, ValueError):
+            pass
+
+        tasks = []
+        try:
+            with open(os.path.join(self.data_dir, "tasks.json"), "r") as f:
+                tasks = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if isinstance(settings, dict) and settings.get("sync_enabled"):
+            # A device of its own, separate from a tray app on the same machine
+            self.sync = SyncReplica(load_device_id("~/.pomodoro_live_server_id"),
+                                    os.path.join(self.data_dir, "sync"))
+            try:
+                self.sync.load()
+                # Seed empty logs from tasks.json, as the first tray app would
+                if not self.sync.clock:
+                    for record in TaskList.from_records(tasks).to_records():
+                        self.sync.import_record(record)
+                self.tasks = TaskList.from_records(self.sync.records())
+            except OSError as e:
+                print(f"Error loading synced tasks: {e}")
+        else:
+            try:
+                self.tasks = TaskList.from_records(tasks)
+            except ValueError:
+                pass
+
+    async def run_sync(self):
+        """Merge other devices' task changes every SYNC_INTERVAL seconds"""
+        while True:
+            await asyncio.sleep(SYNC_INTERVAL)
+            self.pull_sync()
+
+    def pull_sync(self):
+        try:
+            if self.sync.pull():
+                self.tasks = TaskList.from_records(self.sync.records())
+                self.on_change("tasks")
+        except OSError as e:
+            print(f"Sync error: {e}")
+
+    def save_tasks(self):
+        if self.sync:
+            # Changes are already in the sync log
+            return
+        try:
+            with open(os.path.join(self.data_dir, "tasks.json"), "w") as f:
+                json.dump(self.tasks.to_records(), f)
+        except OSError as e:
+            print(f"Error saving tasks: {e}")
+
+    def mode_duration(self):
+        if self.timer_mode == "short_break":
+            return self.short_break_time
+        if self.timer_mode == "long_break":
+            return self.long_break_time
+        return self.pomodoro_time
+
+    def timer_message(self):
+        return {
+            "type": "timer",
+            "mode": self.timer_mode,
+            "time": self.current_time,
+            "running": self.timer_running,
+            "pomodoro_count": self.pomodoro_count
+        }
+
+    def tasks_message(self):
+        return {"type": "tasks", "tasks": self.tasks.to_records()}
+
+    def start(self):
+        if self.timer_running:
+            return
+        self.timer_running = True
+        self.deadline = time.time() + self.current_time
+        # Resuming after a pause keeps the session's original start
+        if self.session_started is None:
+            self.session_started = time.time()
+        self.ticker = asyncio.get_running_loop().create_task(self.run_timer())
+        self.on_change("timer")
+
+    def pause(self):
+        if not self.timer_running:
+            return
+        self.timer_running = False
+        self.current_time = max(0, round(self.deadline - time.time()))
+        self.stop_ticker()
+        self.on_change("timer")
+
+    def reset(self):
+        self.timer_running = False
+        self.session_started = None
+        self.stop_ticker()
+        self.current_time = self.mode_duration()
+        self.on_change("timer")
+
+    def set_mode(self, mode):
+        if mode not in ("pomodoro", "short_break", "long_break"):
+            raise ValueError(f"unknown mode {mode!r}")
+        self.timer_mode = mode
+        self.reset()
+
+    def stop_ticker(self):
+        if self.ticker and self.ticker is not asyncio.current_task():
+            self.ticker.cancel()
+        self.ticker = None
+
+    async def run_timer(self):
+        """Count down to the deadline, waking on each whole second"""
+        while self.timer_running:
+            remaining = self.deadline - time.time()
+            if remaining <= 0:
+                break
+            # Sleep to the next second boundary so ticks don't drift
+            await asyncio.sleep(remaining - int(remaining) or 1)
+            self.current_time = max(0, round(self.deadline - time.time()))
+            self.on_change("timer")
+
+        if self.timer_running:
+            self.completed()
+
+    def session_event(self):
+        """Describe the session that just finished, like the tray app's events"""
+        duration = self.mode_duration()
+        completed_at = int(time.time())
+        # Pauses make a session longer than its duration, so use when it really started
+        started_at = int(self.session_started) if self.session_started else completed_at - duration
+        return {
+            "id": uuid.uuid4().hex,
+            "user": self.user_name,
+            "team": self.team,
+            "mode": self.timer_mode,
+            "task": None,
+            "duration": duration,
+            "started_at": started_at,
+            "completed_at": completed_at
+        }
+
+    def save_pomodoro_count(self):
+        """Store pomodoro_count in settings.json, keeping the other settings"""
+        path = os.path.join(self.data_dir, "settings.json")
+        try:
+            with open(path, "r") as f:
+                settings = json.load(f)
+        except (OSError, ValueError):
+            settings = {}
+        if not isinstance(settings, dict):
+            settings = {}
+        settings["pomodoro_count"] = self.pomodoro_count
+
+        try:
+            os.makedirs(self.data_dir, exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                json.dump(settings, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Error saving settings: {e}")
+
+    def completed(self):
+        """Switch modes when a session ends, as the tray app does"""
+        self.timer_running = False
+        self.ticker = None
+        try:
+            self.sessions.record(self.session_event())
+        except OSError as e:
+            print(f"Error recording session: {e}")
+
+        if self.timer_mode == "pomodoro":
+            self.pomodoro_count += 1
+            self.save_pomodoro_count()
+            if self.pomodoro_count % self.long_break_interval == 0:
+                self.set_mode("long_break")
+            else:
+                self.set_mode("short_break")
+        else:
+            self.set_mode("pomodoro")
+
+    def add_task(self, text):
+        name, estimate, priority = parse_task_input(text)
+        if not name:
+            return
+        if self.sync:
+            try:
+                self.tasks.append(self.sync.add(name, estimate=estimate, priority=priority))
+            except OSError as e:
+                print(f"Error syncing task: {e}")
+                return
+        else:
+            self.tasks.add(name, estimate=estimate, priority=priority)
+        self.save_tasks()
+        self.on_change("tasks")
+
+    def toggle_task(self, index):
+        completed = not self.tasks.is_completed(index)
+        if self.sync:
+            try:
+                self.sync.set_completed(self.tasks[index]["id"], completed)
+            except OSError as e:
+                print(f"Error syncing task: {e}")
+                return
+        self.tasks.set_completed(index, completed)
+        self.save_tasks()
+        self.on_change("tasks")
+
+    def delete_task(self, index):
+        if self.sync:
+            try:
+                self.sync.delete(self.tasks[index]["id"])
+            except OSError as e:
+                print(f"Error syncing task: {e}")
+                return
+        del self.tasks[index]
+        self.save_tasks()
+        self.on_change("tasks")
+
+    def handle(self, command):
+        """Apply a command sent by a client"""
+        if not isinstance(command, dict):
+            raise ValueError("expected a JSON object")
+        action = command.get("action")
+        if action == "start":
+            self.start()
+        elif action == "pause":
+            self.pause()
+        elif action == "reset":
+            self.reset()
+        elif action == "mode":
+            self.set_mode(command.get("mode"))
+        elif action == "add_task":
+            self.add_task(str(command.get("name", "")))
+        elif action == "toggle_task":
+            self.toggle_task(int(command["index"]))
+        elif action == "delete_task":
+            self.delete_task(int(command["index"]))
+        else:
+            raise ValueError(f"unknown action {action!r}")
+
+
+class Hub:
+    """Tracks connected clients and broadcasts pre-encoded state frames
+
+    Each change is serialized and framed once; every client gets the same
+    bytes object. The latest frame of each type is also kept so new
+    clients receive the current state immediately.
+    """
+
+    def __init__(self, data_dir="data"):
+        self.clients = set()
+        self.frames = {}
+        self.state = TimerState(self.publish, data_dir)
+        self.frames["tasks"] = self.encode(self.state.tasks_message())
+        self.frames["timer"] = self.encode(self.state.timer_message())
+
+    def encode(self, message):
+        return encode_frame(json.dumps(message, separators=(",", ":")).encode("utf-8"))
+
+    def publish(self, kind):
+        if kind == "tasks":
+            frame = self.encode(self.state.tasks_message())
+        else:
+            frame = self.encode(self.state.timer_message())
+        self.frames[kind] = frame
+        for client in self.clients:
+            client.send_latest(kind, frame)
+
+    def join(self, client):
+        self.clients.add(client)
+        for kind, frame in self.frames.items():
+            client.send_latest(kind, frame)
+
+    def leave(self, client):
+        self.clients.discard(client)
+
+
+class WebSocketConnection(asyncio.Protocol):
+    """One client connection, kept as small as possible
+
+    There is no task or stream per connection: the protocol reacts to
+    callbacks from the transport. When a client can't keep up, asyncio
+    calls pause_writing(); from then on only the newest frame of each
+    type is kept and it is sent once the client drains (latest state
+    wins, older updates are simply skipped).
+    """
+    __slots__ = ("hub", "transport", "buffer", "upgraded", "paused", "pending")
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.transport = None
+        self.buffer = bytearray()
+        self.upgraded = False
+        self.paused = False
+        self.pending = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.set_write_buffer_limits(high=WRITE_BUFFER_LIMIT)
+
+    def connection_lost(self, exc):
+        self.hub.leave(self)
+        self.pending = None
+        self.buffer = None
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        pending, self.pending = self.pending, None
+        if pending:
+            for frame in pending.values():
+                self.transport.write(frame)
+
+    def send_latest(self, kind, frame):
+        if self.paused:
+            if self.pending is None:
+                self.pending = {}
+            self.pending[kind] = frame
+        else:
+            self.transport.write(frame)
+
+    def data_received(self, data):
+        self.buffer += data
+        if not self.upgraded:
+            self.handshake()
+        if self.upgraded:
+            self.read_frames()
+
+    def handshake(self):
+        end = self.buffer.find(b"\r\n\r\n")
+        if end < 0:
+            if len(self.buffer) > MAX_HANDSHAKE_SIZE:
+                self.reject(b"431 Request Header Fields Too Large")
+            return
+
+        request = bytes(self.buffer[:end]).decode("latin-1")
+        del self.buffer[:end + 4]
+
+        headers = {}
+        for line in request.split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        key = headers.get("sec-websocket-key")
+        if "websocket" not in headers.get("upgrade", "").lower() or not key:
+            self.reject(b"426 Upgrade Required")
+            return
+
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode("ascii")).digest())
+        self.transport.write(
+            b"HTTP/1.1 101 Switching Protocols\r\n"
+            b"Upgrade: websocket\r\n"
+            b"Connection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        self.upgraded = True
+        self.hub.join(self)
+
+    def reject(self, status):
+        self.transport.write(b"HTTP/1.1 " + status + b"\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        self.transport.close()
+        self.buffer.clear()
+
+    def read_frames(self):
+        buffer = self.buffer
+        while buffer is not None and len(buffer) >= 2 and not self.transport.is_closing():
+            first, second = buffer[0], buffer[1]
+            opcode = first & 0x0F
+            length = second & 0x7F
+            offset = 2
+            if length == 126:
+                if len(buffer) < 4:
+                    return
+                length = struct.unpack_from("!H", buffer, 2)[0]
+                offset = 4
+            elif length == 127:
+                if len(buffer) < 10:
+                    return
+                length = struct.unpack_from("!Q", buffer, 2)[0]
+                offset = 10
+
+            if length > MAX_MESSAGE_SIZE:
+                self.close(1009)
+                return
+            if not second & 0x80:
+                # Clients must mask their frames
+                self.close(1002)
+                return
+            if len(buffer) < offset + 4 + length:
+                return
+
+            mask = buffer[offset:offset + 4]
+            payload = bytes(buffer[offset + 4:offset + 4 + length])
+            del buffer[:offset + 4 + length]
+            if length:
+                # XOR the payload with the repeating 4-byte mask in one go
+                key = int.from_bytes((mask * (length // 4 + 1))[:length], "big")
+                payload = (int.from_bytes(payload, "big") ^ key).to_bytes(length, "big")
+
+            if not first & 0x80 or opcode == OP_CONTINUATION:
+                # Commands are tiny; fragmented messages aren't supported
+                self.close(1003)
+                return
+            self.handle_frame(opcode, payload)
+            buffer = self.buffer
+
+    def handle_frame(self, opcode, payload):
+        if opcode == OP_TEXT:
+            try:
+                self.hub.state.handle(json.loads(payload))
+            except (ValueError, KeyError, IndexError, TypeError, OverflowError) as e:
+                error = json.dumps({"type": "error", "error": str(e)}).encode("utf-8")
+                self.transport.write(encode_frame(error))
+        elif opcode == OP_PING:
+            self.transport.write(encode_frame(payload, OP_PONG))
+        elif opcode == OP_CLOSE:
+            self.close(1000)
+        elif opcode == OP_BINARY:
+            self.close(1003)
+
+    def close(self, code):
+        if not self.transport.is_closing():
+            self.transport.write(close_frame(code))
+            self.transport.close()
+        self.hub.leave(self)
+
+
+def raise_open_file_limit():
+    """Allow as many sockets as the OS lets this process have"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+async def serve(host, port, data_dir):
+    hub = Hub(data_dir)
+    loop = asyncio.get_running_loop()
+    syncer = loop.create_task(hub.state.run_sync()) if hub.state.sync else None
+    server = await loop.create_server(lambda: WebSocketConnection(hub), host, port, backlog=1024)
+    print(f"Live timer server listening on ws://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if syncer:
+            syncer.cancel()
+            try:
+                hub.state.sync.snapshot()
+            except OSError as e:
+                print(f"Error saving sync snapshot: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pomodoro live timer WebSocket server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--data", default="data",
+                        help="directory with settings.json and tasks.json; use a separate one "
+                             "from a running tray app unless sync is enabled")
+    args = parser.parse_args()
+
+    raise_open_file_limit()
+    try:
+        asyncio.run(serve(args.host, args.port, args.data))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import gzip
+import http.client
+import json
+import os
+import random
+import threading
+from urllib.parse import urlsplit
+
+
+class Outbox:
+    """Durable queue that ships session events to a remote endpoint in batches
+
+    Events are appended to data/outbox.jsonl (one JSON object per line)
+    and fsynced before put() returns, so nothing queued is lost if the app
+    crashes or is quit. A background thread reads batches from the last
+    acknowledged byte offset, POSTs them gzip-compressed over a single
+    kept-alive connection and only then advances the offset stored in
+    data/outbox.offset. Failed sends are retried with exponential backoff.
+
+    Every event carries an "id" that the server uses as an idempotency
+    key, so a batch that is resent after a crash or a lost response is
+    not counted twice.
+    """
+
+    def __init__(self, url, path="data/outbox.jsonl", batch_size=100,
+                 timeout=10, min_backoff=1, max_backoff=300):
+        self.url = urlsplit(url)
+        self.path = path
+        self.offset_path = os.path.splitext(path)[0] + ".offset"
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.running = False
+        self.stopped = threading.Event()
+        self.thread = None
+        self.connection = None
+        self.failures = 0
+
+        self.offset = self.load_offset()
+        self.recover()
+
+    def load_offset(self):
+        """Read the offset of the first event not yet acknowledged"""
+        try:
+            with open(self.offset_path, "r") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def save_offset(self):
+        # Write then rename so a crash never leaves a half-written offset
+        tmp_path = self.offset_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(self.offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+    def recover(self):
+        """Drop a partially written last line left behind by a crash"""
+        if not os.path.exists(self.path):
+            self.offset = 0
+            return
+
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+        if self.offset > end:
+            self.offset = end
+
+    def put(self, event):
+        """Queue an event; returns once it is safely on disk"""
+        line = json.dumps(event) + "\n"
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.wakeup.notify()
+
+    def pending(self):
+        """Number of queued events that haven't been acknowledged yet"""
+        with self.lock:
+            events, _ = self.read_batch(None)
+        return len(events)
+
+    def read_batch(self, limit):
+        """Read up to `limit` complete events starting at the current offset
+
+        Returns the events and the byte offset just past the last line read.
+        """
+        events = []
+        end = self.offset
+        if not os.path.exists(self.path):
+            return events, end
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # Skip a corrupt line rather than block the queue on it
+                    pass
+                if limit is not None and len(events) >= limit:
+                    break
+        return events, end
+
+    def acknowledge(self, end):
+        """Mark everything before byte `end` as delivered"""
+        with self.lock:
+            self.offset = end
+
+            # Once the queue is drained, start over with an empty file
+            if os.path.getsize(self.path) == self.offset:
+                open(self.path, "w").close()
+                self.offset = 0
+            self.save_offset()
+
+    def start(self):
+        """Start the background sender"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.running = True
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the background sender; queued events stay on disk"""
+        with self.lock:
+            self.running = False
+            self.wakeup.notify()
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(self.timeout)
+        self.close_connection()
+
+    def run(self):
+        while True:
+            with self.lock:
+                if not self.running:
+                    return
+                events, end = self.read_batch(self.batch_size)
+                if not events and end == self.offset:
+                    self.wakeup.wait()
+                    continue
+
+            if events:
+                try:
+                    delivered = self.send(events)
+                except (OSError, http.client.HTTPException) as e:
+                    # Only report the start of an outage, not every retry
+                    if self.failures == 0:
+                        print(f"Outbox send error: {e}")
+                    self.close_connection()
+                    delivered = False
+                if not delivered:
+                    self.backoff()
+                    continue
+
+            self.failures = 0
+            self.acknowledge(end)
+
+    def backoff(self):
+        """Wait before retrying, doubling the delay after each failure
+
+        New events don't cut the wait short; only stop() does.
+        """
+        self.failures += 1
+        delay = min(self.max_backoff, self.min_backoff * 2 ** (self.failures - 1))
+        self.stopped.wait(random.uniform(delay / 2, delay))
+
+    def send(self, events):
+        """POST one batch; returns True once the server has it"""
+        body = gzip.compress(json.dumps({"events": events}).encode("utf-8"))
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+            "Idempotency-Key": events[0].get("id", "") + ":" + events[-1].get("id", "")
+        }
+
+        connection = self.get_connection()
+        connection.request("POST", self.url.path or "/", body, headers)
+        response = connection.getresponse()
+        response.read()
+
+        if response.getheader("Connection", "").lower() == "close":
+            self.close_connection()
+
+        if 200 <= response.status < 300:
+            return True
+        if 400 <= response.status < 500 and response.status not in (408, 429):
+            # The server will never accept this batch; don't retry it forever
+            print(f"Outbox batch rejected with HTTP {response.status}, dropping {len(events)} events")
+            return True
+        return False
+
+    def get_connection(self):
+        if self.connection is None:
+            if self.url.scheme == "https":
+                self.connection = http.client.HTTPSConnection(self.url.netloc, timeout=self.timeout)
+            else:
+                self.connection = http.client.HTTPConnection(self.url.netloc, timeout=self.timeout)
+        return self.connection
+
+    def close_connection(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
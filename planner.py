@@ -0,0 +1,164 @@
+import heapq
+from bisect import bisect_left
+
+
+class Planner:
+    """Packs open tasks into the pomodoros that fit in a day window
+
+    The window is cut into pomodoro slots following the same rhythm as
+    the timer: a short break after each pomodoro and a long break after
+    every `long_break_interval` of them. Slots between two long breaks
+    form a cycle, and cycles are the bins tasks are packed into.
+
+    Tasks are taken from a heap in priority order (highest priority, then
+    oldest first). Each one goes into the cycle with the least free room
+    that still fits its whole estimate (best fit), so a task isn't split
+    by a long break when it doesn't have to be. A task too big for any
+    single cycle is spread over the earliest free slots. Tasks that don't
+    fit anywhere right now are set aside until room frees up.
+
+    Completing a task frees its slots, including one already under way.
+    Tasks planned after the first freed slot go back on the heap with the
+    ones set aside, and only that tail of the day is packed again, so
+    later work moves up into the gap; nothing is re-planned from scratch.
+    """
+
+    def __init__(self, pomodoro_time, short_break_time, long_break_time, long_break_interval):
+        self.pomodoro_time = pomodoro_time
+        self.short_break_time = short_break_time
+        self.long_break_time = long_break_time
+        self.long_break_interval = max(1, long_break_interval)
+
+        self.slots = []  # (start, end) of every pomodoro slot in the window
+        self.slot_tasks = []  # task key planned into each slot, or None
+        self.cycles = []  # slot indices of each cycle
+        self.closed = 0  # slots before this index have started and can't be planned
+        self.heap = []  # tasks not planned yet
+        self.deferred = []  # heap entries that didn't fit last time
+        self.planned = {}  # task key -> (heap entry, slot indices)
+        self.removed = set()  # keys still in the heap that shouldn't be planned
+        self.names = {}
+
+    def build_slots(self, start, end, pomodoro_count=0):
+        """Lay out the pomodoro slots that fit between `start` and `end`"""
+        self.slots = []
+        self.cycles = [[]]
+        count = pomodoro_count
+        t = start
+        while t + self.pomodoro_time <= end:
+            self.cycles[-1].append(len(self.slots))
+            self.slots.append((t, t + self.pomodoro_time))
+            t += self.pomodoro_time
+            count += 1
+            if count % self.long_break_interval == 0:
+                t += self.long_break_time
+                self.cycles.append([])
+            else:
+                t += self.short_break_time
+
+        self.cycles = [cycle for cycle in self.cycles if cycle]
+        self.slot_tasks = [None] * len(self.slots)
+        self.closed = 0
+
+    def plan(self, tasks, start, end, pomodoro_count=0):
+        """Plan `tasks` into the window from scratch
+
+        `tasks` yields (key, name, estimate, priority, created_at) tuples.
+        """
+        self.build_slots(start, end, pomodoro_count)
+        self.planned = {}
+        self.deferred = []
+        self.removed = set()
+        self.names = {}
+
+        heap = []
+        for key, name, estimate, priority, created_at in tasks:
+            heap.append((-priority, created_at, key, max(1, estimate)))
+            self.names[key] = name
+        heapq.heapify(heap)
+        self.heap = heap
+        self.fill()
+
+    def fill(self):
+        """Pack tasks from the heap into the free slots"""
+        free = self.slot_tasks[self.closed:].count(None)
+        largest_cycle = max((len(cycle) for cycle in self.cycles), default=0)
+        skipped = []
+
+        while free and self.heap:
+            entry = heapq.heappop(self.heap)
+            if entry[2] in self.removed or entry[2] in self.planned:
+                self.removed.discard(entry[2])
+                continue
+            estimate = entry[3]
+            slots = self.best_fit(estimate) if estimate <= largest_cycle else None
+            if slots is None and (estimate > largest_cycle and estimate <= free):
+                # Bigger than a whole cycle: take the earliest free slots
+                slots = [i for i in range(self.closed, len(self.slots))
+                         if self.slot_tasks[i] is None][:estimate]
+            if slots is None:
+                skipped.append(entry)
+                continue
+
+            for i in slots:
+                self.slot_tasks[i] = entry[2]
+            self.planned[entry[2]] = (entry, slots)
+            free -= len(slots)
+
+        self.deferred.extend(skipped)
+
+    def best_fit(self, estimate):
+        """Free slots of the fullest cycle that still has room for `estimate`"""
+        best = None
+        best_free = None
+        for cycle in self.cycles:
+            free = [i for i in cycle if i >= self.closed and self.slot_tasks[i] is None]
+            if estimate <= len(free) and (best is None or len(free) < len(best_free)):
+                best, best_free = cycle, free
+                if len(free) == estimate:
+                    break
+        return best_free[:estimate] if best is not None else None
+
+    def add(self, key, name, estimate=1, priority=0, created_at=0):
+        """Plan a new task into whatever room is left"""
+        self.names[key] = name
+        self.removed.discard(key)
+        heapq.heappush(self.heap, (-priority, created_at, key, max(1, estimate)))
+        self.fill()
+
+    def complete(self, key, now=None):
+        """Drop a finished task and move the tasks planned after it up"""
+        planned = self.planned.pop(key, None)
+        if planned is None:
+            # Still waiting in the heap; skip it when it comes up
+            self.removed.add(key)
+            return
+
+        # Slots that have started (including this task's current one) can't
+        # take another task
+        if now is not None:
+            self.closed = bisect_left(self.slots, (now,))
+        for i in planned[1]:
+            self.slot_tasks[i] = None
+        freed = [i for i in planned[1] if i >= self.closed]
+        if not freed:
+            return
+
+        # Re-pack everything planned after the first freed slot, together
+        # with the tasks set aside earlier, which may fit now
+        first = min(freed)
+        for other, (entry, slots) in list(self.planned.items()):
+            if min(slots) > first:
+                for i in slots:
+                    self.slot_tasks[i] = None
+                del self.planned[other]
+                heapq.heappush(self.heap, entry)
+        for entry in self.deferred:
+            heapq.heappush(self.heap, entry)
+        self.deferred = []
+        self.fill()
+
+    def schedule(self):
+        """Return (start, end, key, name) for every planned slot, in time order"""
+        return [(start, end, key, self.names.get(key))
+                for (start, end), key in zip(self.slots, self.slot_tasks) if key is not None]
@@ -0,0 +1,51 @@
+import json
+import os
+import time
+
+
+class SessionLog:
+    """Append-only record of completed sessions, one file per month
+
+    Each finished session is written as a JSON line to
+    data/sessions/YYYY-MM.jsonl, picked by the local month it ended in.
+    Once a month is over its file no longer changes, which lets exports
+    cache it.
+    """
+
+    def __init__(self, directory="data/sessions"):
+        self.directory = directory
+
+    def path(self, month):
+        return os.path.join(self.directory, f"{month}.jsonl")
+
+    def record(self, session):
+        """Append a session (a dict with at least completed_at) to its month"""
+        month = time.strftime("%Y-%m", time.localtime(session["completed_at"]))
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path(month), "a") as f:
+            f.write(json.dumps(session) + "\n")
+
+    def months(self):
+        """Months that have sessions, oldest first, as "YYYY-MM" strings"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(name[:-len(".jsonl")] for name in names if name.endswith(".jsonl"))
+
+    def sessions(self, month):
+        """Stream the sessions recorded in `month`"""
+        try:
+            f = open(self.path(month), "r")
+        except OSError:
+            return
+        with f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Skip a partially written last line
+                    continue
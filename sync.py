@@ -0,0 +1,340 @@
+import json
+import os
+import platform
+import re
+import time
+import uuid
+
+
+def load_device_id(path="~/.pomodoro_device_id"):
+    """Return the sync device id kept in `path`, generating it on first use
+
+    Host names aren't unique, so the id is the host name plus a random
+    suffix. Keep the file outside the synced data/ directory, or every
+    device would end up with the same id.
+    """
+    path = os.path.expanduser(path)
+    try:
+        with open(path, "r") as f:
+            device = f.read().strip()
+        if device:
+            return device
+    except OSError:
+        pass
+
+    host = re.sub(r"[^A-Za-z0-9_.]+", "_", platform.node())[:32] or "device"
+    device = f"{host}_{uuid.uuid4().hex[:12]}"
+    try:
+        with open(path, "w") as f:
+            f.write(device + "\n")
+    except OSError as e:
+        print(f"Error saving device id: {e}")
+    return device
+
+
+class SyncReplica:
+    """Conflict-free task replica for syncing tasks between devices
+
+    Instead of rewriting tasks.json, every change to the task list is
+    recorded as an operation in an append-only log that only this device
+    writes to (data/sync/<device>.jsonl). Other devices' logs arrive through
+    whatever file-sync tool shares data/, and only the bytes added since the
+    last pull are read and merged.
+
+    Each operation carries the device's sequence number and a Lamport
+    timestamp. The replica keeps a vector clock with the highest sequence
+    number applied from every device, so delta_since() can hand another
+    replica exactly the operations it hasn't seen yet. Merging is
+    deterministic regardless of order:
+
+    - "add" creates a task under a globally unique id (<device>-<seq>),
+      optionally with initial fields
+    - "set" updates task fields; per field, the highest (lamport, device) wins
+    - "incr" adds to counter fields, so increments from every device count
+    - "delete" leaves a tombstone that always wins over other operations
+
+    The logs only ever grow, so replaying all of them would make startup
+    slower with every change ever made. snapshot() saves the merged state
+    together with how far each log was read (data/sync/<device>.state.json,
+    which no other device reads), and load() starts from it and only reads
+    the operations appended since. delta_since() can then only hand out
+    operations applied after the snapshot; replicas further behind catch
+    up from the logs.
+    """
+
+    def __init__(self, device_id, directory="data/sync"):
+        self.device_id = device_id
+        self.directory = directory
+        self.log_path = os.path.join(directory, f"{device_id}.jsonl")
+        self.snapshot_path = os.path.join(directory, f"{device_id}.state.json")
+
+        self.clock = {}  # device -> highest sequence number applied
+        self.ops = {}  # device -> list of operations, in sequence order
+        self.ops_base = {}  # device -> sequence number before self.ops[device][0]
+        self.offsets = {}  # device -> bytes of its log already read
+        self.lamport = 0
+        self.tasks = {}  # task id -> task state
+        self.pending = {}  # device -> {seq: op} that arrived out of order
+
+    def load(self):
+        """Read all logs in the sync directory, including our own"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.restore()
+        applied = self.pull(include_self=True)
+
+        # Drop a partial line a crash left at the end of our own log, so
+        # the next operation doesn't get glued onto it
+        offset = self.offsets.get(self.device_id, 0)
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > offset:
+            with open(self.log_path, "rb+") as f:
+                f.truncate(offset)
+
+        if applied:
+            try:
+                self.snapshot()
+            except OSError as e:
+                print(f"Error saving sync snapshot: {e}")
+        return applied
+
+    def snapshot(self):
+        """Save the merged state and log offsets so the next load skips the replay"""
+        state = {
+            "clock": self.clock,
+            "offsets": self.offsets,
+            "lamport": self.lamport,
+            "pending": {device: list(ops.values()) for device, ops in self.pending.items()},
+            "tasks": list(self.tasks.values())
+        }
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def restore(self):
+        """Start from the last snapshot, if it still matches the logs on disk"""
+        try:
+            with open(self.snapshot_path, "r") as f:
+                state = json.load(f)
+
+            # A log that is shorter than what the snapshot read was replaced,
+            # so the snapshot can't be trusted; replay everything instead
+            for device, offset in state["offsets"].items():
+                path = os.path.join(self.directory, f"{device}.jsonl")
+                if not os.path.exists(path) or os.path.getsize(path) < offset:
+                    return False
+
+            tasks = {}
+            for task in state["tasks"]:
+                task["order"] = tuple(task["order"])
+                task["stamps"] = {key: tuple(stamp) for key, stamp in task["stamps"].items()}
+                tasks[task["id"]] = task
+            pending = {device: {op["seq"]: op for op in ops}
+                       for device, ops in state["pending"].items()}
+            clock, offsets, lamport = state["clock"], state["offsets"], state["lamport"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        self.clock, self.offsets, self.lamport = clock, offsets, lamport
+        self.pending, self.tasks = pending, tasks
+        self.ops = {}
+        self.ops_base = dict(clock)
+        return True
+
+    def pull(self, include_self=False):
+        """Merge operations appended to other devices' logs since the last pull
+
+        Returns the number of operations applied.
+        """
+        applied = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+
+        for name in sorted(names):
+            if not name.endswith(".jsonl"):
+                continue
+            device = name[:-len(".jsonl")]
+            if device == self.device_id and not include_self:
+                continue
+            applied += self.merge(self.read_log(device))
+        return applied
+
+    def read_log(self, device):
+        """Read the complete lines appended to a device's log since last time"""
+        path = os.path.join(self.directory, f"{device}.jsonl")
+        ops = []
+        offset = self.offsets.get(device, 0)
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    # A line without a newline is still being written or synced
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            return ops
+        self.offsets[device] = offset
+        return ops
+
+    def delta_since(self, clock):
+        """Return the operations a replica with vector clock `clock` is missing"""
+        delta = []
+        for device, ops in self.ops.items():
+            # ops[0] has sequence number ops_base + 1 (1 without a snapshot)
+            delta.extend(ops[max(0, clock.get(device, 0) - self.ops_base.get(device, 0)):])
+        return delta
+
+    def merge(self, ops):
+        """Apply operations from any replica; duplicates are ignored"""
+        applied = 0
+        for op in sorted(ops, key=lambda op: (op["device"], op["seq"])):
+            device = op["device"]
+            if op["seq"] <= self.clock.get(device, 0):
+                continue
+            self.pending.setdefault(device, {})[op["seq"]] = op
+
+            # Apply this device's operations strictly in sequence order
+            waiting = self.pending[device]
+            while self.clock.get(device, 0) + 1 in waiting:
+                self.apply(waiting.pop(self.clock.get(device, 0) + 1))
+                applied += 1
+            if not waiting:
+                del self.pending[device]
+        return applied
+
+    def apply(self, op):
+        device = op["device"]
+        self.clock[device] = op["seq"]
+        self.ops.setdefault(device, []).append(op)
+        self.lamport = max(self.lamport, op["lamport"])
+
+        task = self.tasks.get(op["task"])
+        if task is None:
+            # Operations on a task can arrive before its "add" from another device
+            creator, _, seq = op["task"].rpartition("-")
+            task = self.tasks[op["task"]] = {
+                "id": op["task"], "name": None, "created_at": 0,
+                "order": (creator, int(seq) if seq.isdigit() else 0),
+                "fields": {}, "stamps": {}, "deleted": False
+            }
+
+        if op["op"] == "add":
+            task["name"] = op["name"]
+            task["created_at"] = op["created_at"]
+        if op["op"] in ("add", "set"):
+            stamp = (op["lamport"], device)
+            for key, value in op.get("fields", {}).items():
+                if stamp > task["stamps"].get(key, (0, "")):
+                    task["stamps"][key] = stamp
+                    task["fields"][key] = value
+        elif op["op"] == "incr":
+            for key, amount in op["fields"].items():
+                task["fields"][key] = task["fields"].get(key, 0) + amount
+        elif op["op"] == "delete":
+            task["deleted"] = True
+
+    def record(self, op, **fields):
+        """Append a local operation to our log, then apply it
+
+        The operation is only applied once it is safely on disk. If the
+        write fails, the sequence number stays free; otherwise other
+        replicas would wait for it forever and stop merging this device.
+        """
+        seq = self.clock.get(self.device_id, 0) + 1
+        entry = {"device": self.device_id, "seq": seq, "lamport": self.lamport + 1, "op": op}
+        entry.update(fields)
+
+        os.makedirs(self.directory, exist_ok=True)
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with open(self.log_path, "ab") as f:
+            size = f.tell()
+            try:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError:
+                # Don't leave half a line for the next operation to land on
+                try:
+                    f.truncate(size)
+                except OSError:
+                    pass
+                raise
+
+        self.apply(entry)
+        self.offsets[self.device_id] = size + len(line)
+        return entry
+
+    def add(self, name, created_at=None, **fields):
+        """Add a task and return its record
+
+        Extra keyword arguments set fields on the new task in the same
+        operation, e.g. add("Write report", estimate=3).
+        """
+        task_id = f"{self.device_id}-{self.clock.get(self.device_id, 0) + 1}"
+        entry = {"task": task_id, "name": name,
+                 "created_at": int(time.time()) if created_at is None else created_at}
+        if fields:
+            entry["fields"] = fields
+        self.record("add", **entry)
+        return self.task_record(self.tasks[task_id])
+
+    def import_record(self, record):
+        """Add a task from a plain task dict (as saved in tasks.json)
+
+        Creation and completion times are kept, and focus counters are
+        recorded as increments so they add up with other devices' time.
+        """
+        fields = dict(record)
+        name = fields.pop("name")
+        created_at = fields.pop("created_at", None)
+        fields.pop("id", None)
+        counters = {key: fields.pop(key) for key in ("focus_seconds", "pomodoros") if fields.get(key)}
+        fields.pop("focus_seconds", None)
+        fields.pop("pomodoros", None)
+
+        task = self.add(name, created_at, **fields)
+        if counters:
+            self.increment(task["id"], **counters)
+            task = self.task_record(self.tasks[task["id"]])
+        return task
+
+    def update(self, task_id, **fields):
+        """Set fields on a task, e.g. update(task_id, completed=True)"""
+        self.record("set", task=task_id, fields=fields)
+
+    def increment(self, task_id, **amounts):
+        """Add to counters on a task, e.g. increment(task_id, focus_seconds=60)"""
+        self.record("incr", task=task_id, fields=amounts)
+
+    def set_completed(self, task_id, completed):
+        self.update(task_id, completed=bool(completed),
+                    completed_at=int(time.time()) if completed else 0)
+
+    def delete(self, task_id):
+        self.record("delete", task=task_id)
+
+    def task_record(self, task):
+        record = {
+            "id": task["id"],
+            "name": task["name"],
+            "completed": False,
+            "created_at": task["created_at"]
+        }
+        record.update(task["fields"])
+        if not record.get("completed_at"):
+            record.pop("completed_at", None)
+        return record
+
+    def records(self):
+        """Return the merged, visible tasks in a deterministic order"""
+        visible = [task for task in self.tasks.values()
+                   if not task["deleted"] and task["name"] is not None]
+        # Tasks added in the same second keep the order they were added in
+        visible.sort(key=lambda task: (task["created_at"], task["order"]))
+        return [self.task_record(task) for task in visible]
@@ -0,0 +1,365 @@
+import re
+import time
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime
+
+
+def to_epoch(value):
+    """Convert a stored timestamp (epoch number or ISO string) to epoch seconds"""
+    if value is None:
+        return int(time.time())
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp())
+    return int(value)
+
+
+def parse_task_input(text):
+    """Split "Write report ~3 !2" into the name, an estimate and a priority
+
+    "~N" is the estimate in pomodoros (default 1) and "!N" the priority
+    (default 0, higher comes first).
+    """
+    estimate, priority = 1, 0
+    words = []
+    for word in text.split():
+        match = re.fullmatch(r"([~!])(-?\d+)", word)
+        if match and match.group(1) == "~":
+            estimate = min(max(1, int(match.group(2))), 1000)
+        elif match:
+            priority = min(max(-100, int(match.group(2))), 100)
+        else:
+            words.append(word)
+    return " ".join(words), estimate, priority
+
+
+class Task:
+    """Lightweight view of a single row in a TaskList
+
+    Behaves like the task dicts the menus used to work with, so
+    task["name"] and task["completed"] = True keep working.
+    """
+    __slots__ = ("_tasks", "_index")
+
+    def __init__(self, tasks, index):
+        self._tasks = tasks
+        self._index = index
+
+    def __getitem__(self, key):
+        return self._tasks.get_field(self._index, key)
+
+    def __setitem__(self, key, value):
+        self._tasks.set_field(self._index, key, value)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_record(self):
+        """Return the task as a plain dict"""
+        return self._tasks.record(self._index)
+
+
+class TaskList:
+    """Compact, list-like collection of tasks
+
+    Tasks are stored column by column instead of as one dict per task:
+    names are UTF-8 bytes in one shared buffer addressed by start/end
+    offsets (a str object per name would cost more than the rest of the
+    task together), creation times are integer epoch seconds in an array,
+    and the completed flags are one byte per task in a bytearray, so
+    checking or toggling a task never touches the other rows.
+    """
+    __slots__ = ("_ids", "_name_data", "_name_starts", "_name_ends", "_name_waste",
+                 "_created", "_completed", "_completed_at",
+                 "_estimates", "_priorities", "_focus_seconds", "_pomodoros", "_by_focus")
+
+    def __init__(self, records=()):
+        self._ids = []  # Only set for tasks that need a stable id (sync)
+        self._name_data = bytearray()
+        self._name_starts = array("Q")
+        self._name_ends = array("Q")
+        self._name_waste = 0  # Bytes of renamed or deleted names left in the buffer
+        self._created = array("q")
+        self._completed = bytearray()  # 1 when task i is completed
+        self._completed_at = array("q")  # 0 while the task is open
+        self._estimates = array("H")  # Pomodoros the task is expected to take
+        self._priorities = array("b")  # Higher is planned first
+        self._focus_seconds = array("q")  # Focus time credited to the task
+        self._pomodoros = array("I")  # Pomodoros completed on the task
+        self._by_focus = []  # Sorted (focus_seconds, index) of tasks with any focus time
+        self.extend(records)
+
+    def __len__(self):
+        return len(self._name_starts)
+
+    def __bool__(self):
+        return bool(self._name_starts)
+
+    def __iter__(self):
+        for i in range(len(self._name_starts)):
+            yield Task(self, i)
+
+    def __getitem__(self, index):
+        return Task(self, self._check_index(index))
+
+    def __delitem__(self, index):
+        index = self._check_index(index)
+        del self._ids[index]
+        self._name_waste += self._name_ends[index] - self._name_starts[index]
+        del self._name_starts[index]
+        del self._name_ends[index]
+        self._compact_names()
+        del self._created[index]
+        del self._completed[index]
+        del self._completed_at[index]
+        del self._estimates[index]
+        del self._priorities[index]
+        del self._focus_seconds[index]
+        del self._pomodoros[index]
+        self._index_focus()
+
+    def _check_index(self, index):
+        if index < 0:
+            index += len(self._name_starts)
+        if not 0 <= index < len(self._name_starts):
+            raise IndexError("task index out of range")
+        return index
+
+    def _name(self, index):
+        return self._name_data[self._name_starts[index]:self._name_ends[index]].decode("utf-8")
+
+    def _push_name(self, name):
+        """Append a name to the buffer and return its (start, end) offsets"""
+        start = len(self._name_data)
+        self._name_data += name.encode("utf-8")
+        return start, len(self._name_data)
+
+    def _compact_names(self):
+        """Rewrite the name buffer once most of it belongs to old names"""
+        if self._name_waste * 2 <= len(self._name_data):
+            return
+        data, starts, ends = self._name_data, self._name_starts, self._name_ends
+        compacted = bytearray()
+        for i in range(len(starts)):
+            start = len(compacted)
+            compacted += data[starts[i]:ends[i]]
+            starts[i], ends[i] = start, len(compacted)
+        self._name_data = compacted
+        self._name_waste = 0
+
+    def add(self, name, completed=False, created_at=None, completed_at=None, task_id=None,
+            estimate=1, priority=0, focus_seconds=0, pomodoros=0):
+        """Add a new task to the end of the list"""
+        index = len(self._name_starts)
+        self._ids.append(task_id)
+        start, end = self._push_name(name)
+        self._name_starts.append(start)
+        self._name_ends.append(end)
+        self._created.append(to_epoch(created_at))
+        self._estimates.append(estimate)
+        self._priorities.append(priority)
+        self._focus_seconds.append(focus_seconds)
+        self._pomodoros.append(pomodoros)
+        if focus_seconds:
+            insort(self._by_focus, (focus_seconds, index))
+        if completed:
+            self._completed.append(1)
+            self._completed_at.append(to_epoch(completed_at))
+        else:
+            self._completed.append(0)
+            self._completed_at.append(0)
+
+    def append(self, record):
+        """Add a task given as a dict with name/completed/created_at keys"""
+        self.add(record["name"], record.get("completed", False),
+                 record.get("created_at"), record.get("completed_at"), record.get("id"),
+                 record.get("estimate", 1), record.get("priority", 0),
+                 record.get("focus_seconds", 0), record.get("pomodoros", 0))
+
+    def extend(self, records):
+        """Add many task dicts at once"""
+        flags = self._completed
+        data, starts, ends = self._name_data, self._name_starts, self._name_ends
+        for record in records:
+            self._ids.append(record.get("id"))
+            starts.append(len(data))
+            data += record["name"].encode("utf-8")
+            ends.append(len(data))
+            self._created.append(to_epoch(record.get("created_at")))
+            self._estimates.append(record.get("estimate", 1))
+            self._priorities.append(record.get("priority", 0))
+            self._focus_seconds.append(record.get("focus_seconds", 0))
+            self._pomodoros.append(record.get("pomodoros", 0))
+            if record.get("completed"):
+                flags.append(1)
+                self._completed_at.append(to_epoch(record.get("completed_at")))
+            else:
+                flags.append(0)
+                self._completed_at.append(0)
+
+        self._index_focus()
+
+    def _index_focus(self):
+        """Rebuild the ranking of tasks by focus time"""
+        focus = self._focus_seconds
+        self._by_focus = sorted((focus[i], i) for i in range(len(focus)) if focus[i])
+
+    def is_completed(self, index):
+        return self._completed[index] == 1
+
+    def completed_flags(self):
+        """Return a snapshot of the completed flags for bulk scans
+
+        flags[i] is 1 when task i is completed.
+        """
+        return bytes(self._completed)
+
+    def set_completed(self, index, completed):
+        index = self._check_index(index)
+        if completed:
+            if not self.is_completed(index):
+                self._completed_at[index] = int(time.time())
+            self._completed[index] = 1
+        else:
+            self._completed[index] = 0
+            self._completed_at[index] = 0
+
+    def get_field(self, index, key):
+        if key == "completed":
+            return self._completed[index] == 1
+        if key == "name":
+            return self._name(index)
+        if key == "id" and self._ids[index] is not None:
+            return self._ids[index]
+        if key == "created_at":
+            return datetime.fromtimestamp(self._created[index]).isoformat()
+        if key == "completed_at" and self._completed_at[index]:
+            return datetime.fromtimestamp(self._completed_at[index]).isoformat()
+        if key == "estimate":
+            return self._estimates[index]
+        if key == "priority":
+            return self._priorities[index]
+        if key == "focus_seconds":
+            return self._focus_seconds[index]
+        if key == "pomodoros":
+            return self._pomodoros[index]
+        raise KeyError(key)
+
+    def set_field(self, index, key, value):
+        if key == "name":
+            self._name_waste += self._name_ends[index] - self._name_starts[index]
+            self._name_starts[index], self._name_ends[index] = self._push_name(value)
+            self._compact_names()
+        elif key == "completed":
+            self.set_completed(index, value)
+        elif key == "created_at":
+            self._created[index] = to_epoch(value)
+        elif key == "estimate":
+            self._estimates[index] = value
+        elif key == "priority":
+            self._priorities[index] = value
+        else:
+            raise KeyError(key)
+
+    def record(self, index, flags=None):
+        """Return task `index` as a plain dict, as stored in tasks.json"""
+        if flags is None:
+            completed = self.is_completed(index)
+        else:
+            completed = flags[index] == 1
+        record = {
+            "name": self._name(index),
+            "completed": completed,
+            "created_at": self._created[index]
+        }
+        if self._ids[index] is not None:
+            record["id"] = self._ids[index]
+        if self._completed_at[index]:
+            record["completed_at"] = self._completed_at[index]
+        if self._estimates[index] != 1:
+            record["estimate"] = self._estimates[index]
+        if self._priorities[index]:
+            record["priority"] = self._priorities[index]
+        if self._focus_seconds[index]:
+            record["focus_seconds"] = self._focus_seconds[index]
+        if self._pomodoros[index]:
+            record["pomodoros"] = self._pomodoros[index]
+        return record
+
+    def to_records(self):
+        """Return all tasks as a list of plain dicts for saving"""
+        flags = self.completed_flags()
+        return [self.record(i, flags) for i in range(len(self._name_starts))]
+
+    def completed_before(self, cutoff):
+        """Return tasks completed before epoch `cutoff` as dicts, leaving them in place"""
+        completed_at = self._completed_at
+        flags = self.completed_flags()
+        return [self.record(i, flags) for i in range(len(self._name_starts))
+                if completed_at[i] and completed_at[i] < cutoff]
+
+    def pop_completed_before(self, cutoff):
+        """Remove tasks completed before epoch `cutoff` and return them as dicts"""
+        completed_at = self._completed_at
+        count = len(self._name_starts)
+        keep = [i for i in range(count)
+                if not (completed_at[i] and completed_at[i] < cutoff)]
+        if len(keep) == count:
+            return []
+
+        kept = set(keep)
+        flags = self.completed_flags()
+        removed = [self.record(i, flags) for i in range(count) if i not in kept]
+        remaining = [self.record(i, flags) for i in keep]
+
+        self._ids = []
+        self._name_data = bytearray()
+        self._name_starts = array("Q")
+        self._name_ends = array("Q")
+        self._name_waste = 0
+        self._created = array("q")
+        self._completed = bytearray()
+        self._completed_at = array("q")
+        self._estimates = array("H")
+        self._priorities = array("b")
+        self._focus_seconds = array("q")
+        self._pomodoros = array("I")
+        self.extend(remaining)
+        return removed
+
+    def credit_focus(self, index, seconds, pomodoros=0):
+        """Add focus time (and finished pomodoros) to a task's running totals"""
+        index = self._check_index(index)
+        old = self._focus_seconds[index]
+        if old:
+            del self._by_focus[bisect_left(self._by_focus, (old, index))]
+        self._focus_seconds[index] = old + seconds
+        self._pomodoros[index] += pomodoros
+        if old + seconds:
+            insort(self._by_focus, (old + seconds, index))
+
+    def top_by_focus(self, limit=10):
+        """Return the indices of the `limit` tasks with the most focus time"""
+        return [index for seconds, index in reversed(self._by_focus[-limit:])]
+
+    def index_of(self, task_id):
+        """Index of the task with id `task_id`, or None"""
+        try:
+            return self._ids.index(task_id)
+        except ValueError:
+            return None
+
+    def open_tasks(self):
+        """Yield (index, name, estimate, priority, created_at) for every open task"""
+        flags = self.completed_flags()
+        estimates, priorities, created = self._estimates, self._priorities, self._created
+        for i in range(len(self._name_starts)):
+            if not flags[i]:
+                yield i, self._name(i), estimates[i], priorities[i], created[i]
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(records)
@@ -0,0 +1,222 @@
+"""Self-hosted aggregation server for team focus stats
+
+Clients POST batches of session events to /events and anyone on the team
+can read aggregated stats from /stats/users and /stats/teams. Events are
+the ones the app records when a timer completes:
+
+    {"id": "...", "user": "alice", "team": "core", "mode": "pomodoro",
+     "duration": 1500, "completed_at": 1718000000}
+
+Run it with:
+
+    python team_server.py --port 8765 --db data/team.db
+"""
+import argparse
+import gzip
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+class EventStore:
+    """SQLite store for session events with running per-user totals"""
+
+    def __init__(self, path="data/team.db"):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                id TEXT PRIMARY KEY,
+                user TEXT NOT NULL,
+                team TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                duration INTEGER NOT NULL,
+                completed_at INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS user_stats (
+                user TEXT NOT NULL,
+                team TEXT NOT NULL,
+                pomodoros INTEGER NOT NULL DEFAULT 0,
+                focus_seconds INTEGER NOT NULL DEFAULT 0,
+                break_seconds INTEGER NOT NULL DEFAULT 0,
+                last_seen INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user, team)
+            );
+        """)
+        self.db.commit()
+
+    def add_events(self, events):
+        """Insert a batch of events in one transaction and return how many were new
+
+        Events are deduplicated by id, so a client retrying a batch does
+        not count the same session twice.
+        """
+        rows = []
+        for event in events:
+            rows.append((
+                str(event.get("id") or uuid.uuid4()),
+                str(event.get("user") or "anonymous"),
+                str(event.get("team") or ""),
+                str(event.get("mode") or "pomodoro"),
+                int(event.get("duration") or 0),
+                int(event.get("completed_at") or time.time())
+            ))
+
+        with self.lock:
+            (last_rowid,) = self.db.execute("SELECT COALESCE(MAX(rowid), 0) FROM events").fetchone()
+            with self.db:
+                self.db.executemany("INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+                # Fold only the rows inserted by this batch into the totals
+                self.db.execute("""
+                    INSERT INTO user_stats (user, team, pomodoros, focus_seconds, break_seconds, last_seen)
+                    SELECT user, team,
+                           SUM(mode = 'pomodoro'),
+                           SUM(CASE WHEN mode = 'pomodoro' THEN duration ELSE 0 END),
+                           SUM(CASE WHEN mode = 'pomodoro' THEN 0 ELSE duration END),
+                           MAX(completed_at)
+                    FROM events WHERE rowid > ? GROUP BY user, team
+                    ON CONFLICT (user, team) DO UPDATE SET
+                        pomodoros = pomodoros + excluded.pomodoros,
+                        focus_seconds = focus_seconds + excluded.focus_seconds,
+                        break_seconds = break_seconds + excluded.break_seconds,
+                        last_seen = MAX(last_seen, excluded.last_seen)
+                """, (last_rowid,))
+                (new_rowid,) = self.db.execute("SELECT COALESCE(MAX(rowid), 0) FROM events").fetchone()
+        return new_rowid - last_rowid
+
+    def user_stats(self, team=None):
+        """Return per-user totals, optionally for a single team"""
+        query = "SELECT user, team, pomodoros, focus_seconds, break_seconds, last_seen FROM user_stats"
+        params = ()
+        if team is not None:
+            query += " WHERE team = ?"
+            params = (team,)
+        query += " ORDER BY focus_seconds DESC"
+
+        with self.lock:
+            rows = self.db.execute(query, params).fetchall()
+        keys = ("user", "team", "pomodoros", "focus_seconds", "break_seconds", "last_seen")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def team_stats(self):
+        """Return totals per team"""
+        with self.lock:
+            rows = self.db.execute("""
+                SELECT team, COUNT(*), SUM(pomodoros), SUM(focus_seconds), SUM(break_seconds)
+                FROM user_stats GROUP BY team ORDER BY SUM(focus_seconds) DESC
+            """).fetchall()
+        keys = ("team", "users", "pomodoros", "focus_seconds", "break_seconds")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class TeamRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 handler so clients can keep connections alive between batches"""
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY each
+    # response on a kept-alive connection waits on the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/events":
+            self.send_json(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length <= 0 or length > MAX_BODY_SIZE:
+            # The body wasn't read, so the connection can't be reused
+            self.close_connection = True
+            self.send_json(400, {"error": "missing or oversized body"})
+            return
+
+        body = self.rfile.read(length)
+        try:
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            payload = json.loads(body)
+        except (OSError, ValueError):
+            self.send_json(400, {"error": "invalid body"})
+            return
+
+        events = payload.get("events") if isinstance(payload, dict) else payload
+        if not isinstance(events, list) or not all(isinstance(event, dict) for event in events):
+            self.send_json(400, {"error": "expected a list of events"})
+            return
+
+        try:
+            accepted = self.server.store.add_events(events)
+        except (TypeError, ValueError, OverflowError):
+            # OverflowError covers 1e999 and integers too large for SQLite
+            self.send_json(400, {"error": "invalid event"})
+            return
+        self.send_json(200, {"received": len(events), "accepted": accepted})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats/users":
+            team = parse_qs(url.query).get("team", [None])[0]
+            self.send_json(200, self.server.store.user_stats(team))
+        elif url.path == "/stats/teams":
+            self.send_json(200, self.server.store.team_stats())
+        elif url.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Don't print a line for every batch
+        pass
+
+
+class TeamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store):
+        super().__init__(address, TeamRequestHandler)
+        self.store = store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pomodoro team aggregation server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="data/team.db")
+    args = parser.parse_args()
+
+    store = EventStore(args.db)
+    server = TeamServer((args.host, args.port), store)
+    print(f"Team server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
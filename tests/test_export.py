@@ -0,0 +1,78 @@
+import csv
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from export import SessionExporter
+from sessions import SessionLog
+
+
+class SessionExporterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log = SessionLog(os.path.join(self.directory, "sessions"))
+        self.exporter = SessionExporter(self.log, os.path.join(self.directory, "exports"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def session(self, session_id, completed_at, **fields):
+        session = {"id": session_id, "mode": "pomodoro", "duration": 1500,
+                   "started_at": completed_at - 1500, "completed_at": completed_at}
+        session.update(fields)
+        self.log.record(session)
+
+    def read_csv(self, path):
+        with open(path, newline="") as f:
+            return list(csv.DictReader(f))
+
+    def test_first_export_with_only_current_month(self):
+        now = int(time.time())
+        self.session("a", now)
+        path = os.path.join(self.directory, "exports", "sessions.csv")
+        self.exporter.export_file("csv", path)
+        self.assertEqual([row["id"] for row in self.read_csv(path)], ["a"])
+
+    def test_paused_session_keeps_real_start(self):
+        now = int(time.time())
+        # 25 minutes on the clock with a 10 minute pause in the middle
+        self.session("a", now, started_at=now - 2100, task="Invoice, client A")
+        path = os.path.join(self.directory, "sessions.csv")
+        self.exporter.export_file("csv", path)
+
+        row = self.read_csv(path)[0]
+        self.assertEqual(row["start"], time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now - 2100)))
+        self.assertEqual(row["duration_seconds"], "1500")
+        self.assertEqual(row["task"], "Invoice, client A")
+
+        self.exporter.export_file("ics", os.path.join(self.directory, "sessions.ics"))
+        with open(os.path.join(self.directory, "sessions.ics"), newline="") as f:
+            ics = f.read()
+        self.assertIn("DTSTART:" + time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(now - 2100)), ics)
+        self.assertIn("SUMMARY:Pomodoro: Invoice\\, client A\r\n", ics)
+
+    def test_closed_months_are_cached(self):
+        old = int(time.mktime((2024, 1, 15, 10, 0, 0, 0, 0, -1)))
+        self.session("old", old)
+        self.session("new", int(time.time()))
+        path = os.path.join(self.directory, "sessions.csv")
+        self.exporter.export_file("csv", path)
+
+        chunk = os.path.join(self.directory, "exports", "csv", "2024-01.csv")
+        self.assertTrue(os.path.exists(chunk))
+        built_at = os.path.getmtime(chunk)
+        self.exporter.export_file("csv", path)
+        self.assertEqual(os.path.getmtime(chunk), built_at)
+        self.assertEqual([row["id"] for row in self.read_csv(path)], ["old", "new"])
+
+        # A late write to a closed month rebuilds its chunk
+        os.utime(chunk, (built_at - 10, built_at - 10))
+        self.session("late", old + 60)
+        self.exporter.export_file("csv", path)
+        self.assertEqual([row["id"] for row in self.read_csv(path)], ["old", "late", "new"])
+
+
+if __name__ == "__main__":
+    unittest.main()
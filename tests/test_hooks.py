@@ -0,0 +1,168 @@
+import ast
+import json
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import unittest
+
+from hooks import HookRunner
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def app_method(class_name, name):
+    """Compile one method of a class in app.py without importing its GUI libraries"""
+    with open(APP_PATH) as f:
+        tree = ast.parse(f.read())
+    cls = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == class_name)
+    method = next(node for node in cls.body if isinstance(node, ast.FunctionDef) and node.name == name)
+    namespace = {"os": os, "threading": threading, "time": time, "pygame": None}
+    exec(compile(ast.Module(body=[method], type_ignores=[]), APP_PATH, "exec"), namespace)
+    return namespace[name]
+
+
+class CompletingApp:
+    """The parts of PomodoroTrayApp that timer_completed() talks to"""
+
+    timer_completed = app_method("PomodoroTrayApp", "timer_completed")
+
+    def __init__(self, hooks):
+        self.hooks = hooks
+        self.calls = []
+        self.timer_running = True
+        self.timer_mode = "pomodoro"
+        self.pomodoro_count = 0
+        self.long_break_interval = 4
+        self.outbox = None
+        self.sessions = self
+        self.tray = self
+
+    def session_event(self):
+        return {"mode": self.timer_mode, "duration": 1500}
+
+    def record(self, event):
+        self.calls.append("record")
+
+    def credit_active_task(self, finished=False):
+        self.calls.append("credit")
+
+    def generate_beep(self):
+        return b""
+
+    def notify(self, title, message):
+        pass
+
+    def set_short_break_mode(self):
+        self.calls.append("short_break")
+
+    def set_long_break_mode(self):
+        self.calls.append("long_break")
+
+    def set_pomodoro_mode(self):
+        self.calls.append("pomodoro")
+
+    def save_settings(self):
+        self.calls.append("save_settings")
+
+    def replan(self):
+        self.calls.append("replan")
+
+    def update_menu(self):
+        self.calls.append("update_menu")
+
+
+class HookRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.runners = []
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for runner in self.runners:
+            runner.shutdown()
+        shutil.rmtree(self.directory)
+
+    def make_runner(self, hooks, **options):
+        runner = HookRunner(hooks, **options)
+        self.runners.append(runner)
+        return runner
+
+    def wait_for_runs(self, runner, name, runs, timeout=10):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if runner.stats()["hooks"].get(name, {}).get("runs", 0) >= runs:
+                return runner.stats()["hooks"][name]
+            time.sleep(0.02)
+        self.fail(f"hook {name} did not run")
+
+    def test_slow_hook_does_not_delay_next_session(self):
+        # A 10 second hook with no short timeout, fired from the app's own
+        # timer_completed(); the break must start straight away
+        pid_path = os.path.join(self.directory, "hook.pid")
+        hooks = self.make_runner([{"name": "slow", "command": f"echo $$ > {pid_path}; exec sleep 10",
+                                   "timeout": 30}])
+        app = CompletingApp(hooks)
+
+        start = time.monotonic()
+        app.timer_completed()
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.1)
+        self.assertEqual(app.calls, ["record", "credit", "short_break", "save_settings", "replan", "update_menu"])
+        self.assertEqual(app.pomodoro_count, 1)
+
+        # The hook is still running in the background; stop it so the
+        # test doesn't wait out the sleep
+        deadline = time.monotonic() + 5
+        while not os.path.exists(pid_path) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(hooks.stats()["queue_depth"], 1)
+        with open(pid_path) as f:
+            os.kill(int(f.read()), signal.SIGTERM)
+        stats = self.wait_for_runs(hooks, "slow", 1)
+        self.assertLess(stats["last_seconds"], 5)
+
+    def test_stats_are_saved(self):
+        runner = self.make_runner([{"name": "quick", "command": "true"}])
+        runner.fire({"mode": "pomodoro"})
+        self.wait_for_runs(runner, "quick", 1)
+
+        path = os.path.join(self.directory, "hook_stats.json")
+        runner.save_stats(path)
+        with open(path) as f:
+            saved = json.load(f)
+        self.assertEqual(saved["hooks"]["quick"]["runs"], 1)
+        self.assertEqual(saved["dropped"], 0)
+
+    def test_queue_is_bounded(self):
+        runner = self.make_runner([{"name": "slow", "command": "sleep 1", "timeout": 2}],
+                                  max_workers=1, max_queue=2)
+        for _ in range(5):
+            runner.fire({"mode": "pomodoro"})
+
+        stats = runner.stats()
+        self.assertEqual(stats["dropped"], 3)
+        self.assertEqual(stats["max_queue_depth"], 2)
+
+    def test_hook_receives_event_and_respects_modes(self):
+        runner = self.make_runner([
+            {"name": "check", "command": 'test "$POMODORO_MODE" = pomodoro && grep -q 1500', "on": "pomodoro"},
+            {"name": "breaks", "command": "true", "on": ["short_break"]}
+        ])
+        runner.fire({"mode": "pomodoro", "duration": 1500})
+
+        stats = self.wait_for_runs(runner, "check", 1)
+        self.assertEqual(stats["errors"], 0)
+        self.assertNotIn("breaks", runner.stats()["hooks"])
+
+    def test_malformed_settings_are_ignored(self):
+        self.assertEqual(self.make_runner("./notify.sh").hooks, [])
+        self.assertEqual(self.make_runner(None).hooks, [])
+        runner = self.make_runner(["./notify.sh", 5, {"name": "empty"}, {"command": "true"}])
+        self.assertEqual(runner.hooks, [{"command": "true"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from live_server import TimerState
+from sessions import SessionLog
+from sync import SyncReplica
+
+
+class TimerStateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data = os.path.join(self.directory, "data")
+        os.makedirs(self.data)
+        # Device ids are kept in the home directory
+        patcher = mock.patch.dict(os.environ, {"HOME": self.directory})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.changes = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_settings(self, settings):
+        with open(os.path.join(self.data, "settings.json"), "w") as f:
+            json.dump(settings, f)
+
+    def make_state(self):
+        return TimerState(self.changes.append, self.data)
+
+    def test_completed_pomodoro_is_recorded_and_counted(self):
+        self.write_settings({"pomodoro_time": 1500, "pomodoro_count": 2, "team": "core"})
+        state = self.make_state()
+        state.completed()
+
+        self.assertEqual(state.timer_mode, "short_break")
+        with open(os.path.join(self.data, "settings.json")) as f:
+            settings = json.load(f)
+        self.assertEqual(settings["pomodoro_count"], 3)
+        self.assertEqual(settings["pomodoro_time"], 1500)
+
+        log = SessionLog(os.path.join(self.data, "sessions"))
+        sessions = [session for month in log.months() for session in log.sessions(month)]
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual((sessions[0]["mode"], sessions[0]["duration"], sessions[0]["team"]),
+                         ("pomodoro", 1500, "core"))
+
+    def test_sync_mode_shares_tasks_through_the_logs(self):
+        self.write_settings({"sync_enabled": True})
+        laptop = SyncReplica("laptop", os.path.join(self.data, "sync"))
+        laptop.load()
+        laptop.add("From the laptop", created_at=1700000000)
+
+        state = self.make_state()
+        self.assertEqual([task["name"] for task in state.tasks], ["From the laptop"])
+
+        state.add_task("From the dashboard ~2")
+        state.toggle_task(0)
+        self.assertFalse(os.path.exists(os.path.join(self.data, "tasks.json")))
+        self.assertEqual(laptop.pull(), 2)
+        self.assertEqual([(task["name"], task["completed"]) for task in laptop.records()],
+                         [("From the laptop", True), ("From the dashboard", False)])
+
+        laptop.delete(laptop.records()[0]["id"])
+        state.pull_sync()
+        self.assertEqual([task["name"] for task in state.tasks], ["From the dashboard"])
+        self.assertIn("tasks", self.changes)
+
+
+if __name__ == "__main__":
+    unittest.main()
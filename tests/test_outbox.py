@@ -0,0 +1,170 @@
+import gzip
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from outbox import Outbox
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        events = json.loads(body)["events"]
+        self.server.record(self.headers.get("Idempotency-Key"), events)
+
+        if self.server.drop_responses:
+            # Take the batch but lose the response, like a dropped connection
+            self.server.drop_responses -= 1
+            self.close_connection = True
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """Event endpoint that deduplicates by id like the team server"""
+    daemon_threads = True
+
+    def __init__(self, port):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.lock = threading.Lock()
+        self.posts = []  # Idempotency-Key of every request
+        self.received = []  # Every event received, including resends
+        self.events = {}  # id -> event, once each
+        self.drop_responses = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def record(self, key, events):
+        with self.lock:
+            self.posts.append(key)
+            self.received.extend(events)
+            for event in events:
+                self.events.setdefault(event["id"], event)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class OutboxTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "outbox.jsonl")
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}/events"
+        self.server = None
+        self.outboxes = []
+
+    def tearDown(self):
+        for outbox in self.outboxes:
+            outbox.stop()
+        if self.server:
+            self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def make_outbox(self, **options):
+        options.setdefault("batch_size", 10)
+        outbox = Outbox(self.url, self.path, timeout=2, min_backoff=0.01, max_backoff=0.05, **options)
+        self.outboxes.append(outbox)
+        return outbox
+
+    def events(self, start, count):
+        return [{"id": f"event-{i}", "mode": "pomodoro", "duration": 1500} for i in range(start, start + count)]
+
+    def test_offline_period(self):
+        outbox = self.make_outbox()
+        outbox.start()
+        for event in self.events(0, 25):
+            outbox.put(event)
+
+        # Nothing is listening yet; events wait on disk
+        time.sleep(0.3)
+        self.assertEqual(outbox.pending(), 25)
+
+        self.server = StubServer(self.port)
+        self.assertTrue(wait_until(lambda: outbox.pending() == 0))
+        self.assertEqual(sorted(self.server.events), sorted(e["id"] for e in self.events(0, 25)))
+        self.assertEqual(os.path.getsize(self.path), 0)
+
+    def test_torn_last_line_is_dropped(self):
+        with open(self.path, "w") as f:
+            for event in self.events(0, 3):
+                f.write(json.dumps(event) + "\n")
+            f.write('{"id": "event-3", "mo')
+
+        outbox = self.make_outbox()
+        self.assertEqual(outbox.pending(), 3)
+
+        # New events go after the last complete line, not onto the torn one
+        outbox.put(self.events(4, 1)[0])
+        self.server = StubServer(self.port)
+        outbox.start()
+        self.assertTrue(wait_until(lambda: outbox.pending() == 0))
+        self.assertEqual(sorted(self.server.events), ["event-0", "event-1", "event-2", "event-4"])
+
+    def test_lost_ack_is_resent_with_same_key(self):
+        self.server = StubServer(self.port)
+        self.server.drop_responses = 1
+        outbox = self.make_outbox()
+        for event in self.events(0, 5):
+            outbox.put(event)
+        outbox.start()
+
+        self.assertTrue(wait_until(lambda: outbox.pending() == 0))
+        self.assertEqual(len(self.server.posts), 2)
+        self.assertEqual(self.server.posts[0], self.server.posts[1])
+        self.assertEqual(len(self.server.received), 10)
+        self.assertEqual(len(self.server.events), 5)
+
+    def test_restart_resumes_after_acknowledged_events(self):
+        self.server = StubServer(self.port)
+        outbox = self.make_outbox(batch_size=4)
+        for event in self.events(0, 10):
+            outbox.put(event)
+
+        # Deliver one batch, then "crash" before the rest are sent
+        events, end = outbox.read_batch(outbox.batch_size)
+        self.assertTrue(outbox.send(events))
+        outbox.acknowledge(end)
+        outbox.close_connection()
+
+        restarted = self.make_outbox(batch_size=4)
+        self.assertEqual(restarted.pending(), 6)
+        restarted.start()
+        self.assertTrue(wait_until(lambda: restarted.pending() == 0))
+        self.assertEqual(len(self.server.received), 10)
+        self.assertEqual(len(self.server.events), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
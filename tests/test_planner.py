@@ -0,0 +1,53 @@
+import unittest
+
+from planner import Planner
+from tasks import TaskList, parse_task_input
+
+START = 1700000000
+
+
+class PlannerTest(unittest.TestCase):
+    def setUp(self):
+        # 25 minute pomodoros, 5 minute breaks, 15 minutes after every 4th
+        self.planner = Planner(25 * 60, 5 * 60, 15 * 60, 4)
+        self.tasks = TaskList()
+        for text in ("Write report ~3 !2", "Other ~1", "Later ~2 !-1"):
+            name, estimate, priority = parse_task_input(text)
+            self.tasks.add(name, created_at=START, estimate=estimate, priority=priority)
+        self.planner.plan(self.tasks.open_tasks(), START, START + 9 * 3600)
+
+    def names(self):
+        return [name for start, end, key, name in self.planner.schedule()]
+
+    def test_plan_follows_priority(self):
+        self.assertEqual(self.names(), ["Write report"] * 3 + ["Other"] + ["Later"] * 2)
+
+    def test_completing_moves_later_tasks_up(self):
+        self.planner.complete(0, START)
+        self.assertEqual(self.names(), ["Other", "Later", "Later"])
+        self.assertEqual(self.planner.schedule()[0][0], START)
+
+    def test_completing_mid_slot_drops_the_current_slot(self):
+        # Finished halfway through the report's second pomodoro
+        now = self.planner.slots[1][0] + 600
+        self.planner.complete(0, now)
+
+        schedule = self.planner.schedule()
+        self.assertNotIn("Write report", self.names())
+        # The next task starts in the first slot that hasn't begun yet
+        self.assertEqual(schedule[0][:2], self.planner.slots[2])
+        self.assertEqual(self.names(), ["Other", "Later", "Later"])
+
+    def test_completing_a_task_that_is_not_planned(self):
+        planner = Planner(25 * 60, 5 * 60, 15 * 60, 4)
+        # Only room for three pomodoros, so "Other" and "Later" wait
+        planner.plan(self.tasks.open_tasks(), START, START + 85 * 60)
+        self.assertEqual([key for start, end, key, name in planner.schedule()], [0, 0, 0])
+
+        planner.complete(2)
+        planner.complete(0, START)
+        self.assertEqual([name for start, end, key, name in planner.schedule()], ["Other"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from sync import SyncReplica
+
+
+def delta_bytes(ops):
+    return sum(len(json.dumps(op)) + 1 for op in ops)
+
+
+class TwoReplicaTest(unittest.TestCase):
+    """Two devices exchanging deltas directly, as a file-sync tool would"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.make_replicas("run")
+
+    def make_replicas(self, name):
+        self.laptop = SyncReplica("laptop", os.path.join(self.directory, name, "laptop"))
+        self.desktop = SyncReplica("desktop", os.path.join(self.directory, name, "desktop"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def exchange(self):
+        """Send each replica the operations it is missing; returns both deltas"""
+        to_desktop = self.laptop.delta_since(self.desktop.clock)
+        to_laptop = self.desktop.delta_since(self.laptop.clock)
+        self.desktop.merge(to_desktop)
+        self.laptop.merge(to_laptop)
+        return to_desktop, to_laptop
+
+    def seed(self, count):
+        ids = [self.laptop.add(f"Task {i}", created_at=1700000000)["id"] for i in range(count)]
+        self.exchange()
+        return ids
+
+    def test_delta_size_follows_change_not_backlog(self):
+        sizes = {}
+        for count in (100, 5000):
+            self.make_replicas(str(count))
+            ids = self.seed(count)
+
+            # A concurrent change on each side, including a conflicting field
+            self.laptop.set_completed(ids[10], True)
+            self.laptop.update(ids[20], priority=1)
+            self.desktop.update(ids[20], priority=5)
+            to_desktop, to_laptop = self.exchange()
+
+            self.assertEqual((len(to_desktop), len(to_laptop)), (2, 1))
+            self.assertEqual(self.laptop.records(), self.desktop.records())
+            sizes[count] = delta_bytes(to_desktop) + delta_bytes(to_laptop)
+
+        # Only the per-task ids grow a digit or two with the backlog
+        self.assertLess(sizes[5000], 512)
+        self.assertLess(sizes[5000] - sizes[100], 16)
+
+    def test_merge_is_order_independent(self):
+        ids = self.seed(3)
+        self.laptop.update(ids[0], name="laptop")
+        self.desktop.update(ids[0], name="desktop")
+        self.desktop.increment(ids[1], focus_seconds=60)
+        self.laptop.increment(ids[1], focus_seconds=30, pomodoros=1)
+        self.desktop.delete(ids[2])
+
+        third = SyncReplica("phone", os.path.join(self.directory, "run", "phone"))
+        third.merge(list(reversed(self.desktop.delta_since({}))))
+        third.merge(self.laptop.delta_since({}))
+        self.exchange()
+
+        self.assertEqual(self.laptop.records(), self.desktop.records())
+        self.assertEqual(third.records(), self.laptop.records())
+        self.assertEqual(len(third.records()), 2)
+        self.assertEqual(third.records()[1]["focus_seconds"], 90)
+
+    def test_tasks_added_in_the_same_second_keep_their_order(self):
+        self.seed(12)
+        self.assertEqual([task["name"] for task in self.desktop.records()],
+                         [f"Task {i}" for i in range(12)])
+
+    def test_failed_write_does_not_use_up_a_sequence_number(self):
+        ids = self.seed(2)
+        with mock.patch("sync.os.fsync", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.laptop.set_completed(ids[0], True)
+        self.laptop.set_completed(ids[1], True)
+        self.exchange()
+
+        self.assertEqual(self.desktop.pending, {})
+        self.assertEqual(self.desktop.clock, self.laptop.clock)
+        self.assertEqual([task["completed"] for task in self.desktop.records()], [False, True])
+
+        # The log on disk matches what was applied
+        reloaded = SyncReplica("laptop", self.laptop.directory)
+        reloaded.load()
+        self.assertEqual(reloaded.records(), self.laptop.records())
+
+    def test_import_record_keeps_times_and_counters(self):
+        task = self.laptop.import_record({
+            "name": "Old task", "completed": True, "created_at": 1600000000,
+            "completed_at": 1600000500, "estimate": 3, "priority": 2,
+            "focus_seconds": 3000, "pomodoros": 2
+        })
+        self.assertEqual(task["created_at"], 1600000000)
+        self.assertEqual(task["completed_at"], 1600000500)
+        self.assertEqual((task["estimate"], task["priority"]), (3, 2))
+        self.assertEqual((task["focus_seconds"], task["pomodoros"]), (3000, 2))
+        self.assertTrue(task["completed"])
+
+
+class SharedDirectoryTest(unittest.TestCase):
+    """Two devices whose logs share one directory"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pull_reads_only_new_lines(self):
+        laptop = SyncReplica("laptop", self.directory)
+        desktop = SyncReplica("desktop", self.directory)
+        laptop.load()
+        desktop.load()
+
+        task = laptop.add("Shared")
+        self.assertEqual(desktop.pull(), 1)
+        desktop.set_completed(task["id"], True)
+        self.assertEqual(laptop.pull(), 1)
+        self.assertEqual(laptop.pull(), 0)
+        self.assertEqual(laptop.records(), desktop.records())
+
+    def test_load_drops_torn_line_from_own_log(self):
+        laptop = SyncReplica("laptop", self.directory)
+        laptop.load()
+        laptop.add("First")
+        with open(laptop.log_path, "a") as f:
+            f.write('{"device": "laptop", "seq": 2, "lam')
+
+        restarted = SyncReplica("laptop", self.directory)
+        restarted.load()
+        restarted.add("Second")
+
+        desktop = SyncReplica("desktop", self.directory)
+        desktop.load()
+        self.assertEqual([task["name"] for task in desktop.records()], ["First", "Second"])
+
+    def test_load_starts_from_snapshot(self):
+        laptop = SyncReplica("laptop", self.directory)
+        laptop.load()
+        ids = [laptop.add(f"Task {i}")["id"] for i in range(50)]
+        laptop.set_completed(ids[3], True)
+        laptop.snapshot()
+
+        desktop = SyncReplica("desktop", self.directory)
+        desktop.load()
+        desktop.update(ids[4], priority=2)
+
+        # Only the operation appended after the snapshot is replayed
+        restarted = SyncReplica("laptop", self.directory)
+        self.assertEqual(restarted.load(), 1)
+        self.assertEqual(restarted.records(), desktop.records())
+        self.assertEqual(restarted.delta_since({"laptop": 51, "desktop": 1}), [])
+        restarted.add("After restart")
+        self.assertEqual(len(restarted.delta_since({"laptop": 51, "desktop": 1})), 1)
+
+        # A log replaced behind the snapshot's back forces a full replay
+        with open(restarted.log_path, "r+b") as f:
+            f.truncate(0)
+        fresh = SyncReplica("laptop", self.directory)
+        self.assertEqual(fresh.load(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()